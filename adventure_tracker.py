@@ -0,0 +1,100 @@
+import logging
+import threading
+import time
+from config import ADVENTURE_UPDATE_INTERVAL
+from bot_handlers import get_chart_generator
+
+class Adventure:
+    """1m candles of one adventure, kept current while it lasts."""
+
+    def __init__(self, event_type, start_time):
+        self.event_type = event_type
+        self.start_time = start_time
+        self.candles = None
+        self.lock = threading.Lock()
+
+    def extend_to(self, end_ms):
+        """Fetch the candles after the newest one held, up to end_ms. Call with lock held."""
+        start_ms = self.start_time * 1000
+        if self.candles is not None and not self.candles.empty:
+            # Refetch the newest candle too: it may still have been forming
+            start_ms = int(self.candles.timestamp[-1])
+        newer = get_chart_generator().fetch_base_candles(start_ms, end_ms)
+        if newer is None or newer.empty:
+            return
+
+        self.candles = newer if self.candles is None else self.candles.extend(newer)
+
+class AdventureTracker:
+    """Precomputes the chart data of the adventure in progress.
+
+    Each event begins a new adventure; a background thread appends its
+    newest 1m candles every ADVENTURE_UPDATE_INTERVAL seconds. When the
+    closing event arrives, finish() only has to append the last few
+    candles instead of fetching the whole adventure.
+    """
+
+    # The adventure being closed stays available while the next one begins
+    MAX_ADVENTURES = 2
+
+    def __init__(self, interval=ADVENTURE_UPDATE_INTERVAL):
+        self.interval = interval
+        self._adventures = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def begin(self, event_type, start_time):
+        """Start tracking the adventure opened by an event."""
+        with self._lock:
+            if start_time in self._adventures:
+                return
+            self._adventures[start_time] = Adventure(event_type, start_time)
+            for stale in sorted(self._adventures)[:-self.MAX_ADVENTURES]:
+                del self._adventures[stale]
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name='adventure-tracker', daemon=True
+                )
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def current(self):
+        """The most recently begun adventure, or None."""
+        with self._lock:
+            if not self._adventures:
+                return None
+            return self._adventures[max(self._adventures)]
+
+    def finish(self, start_time, end_time):
+        """Return the 1m Candles of [start_time, end_time], or None if it was not tracked."""
+        with self._lock:
+            adventure = self._adventures.pop(start_time, None)
+        if adventure is None:
+            return None
+
+        with adventure.lock:
+            adventure.extend_to(end_time * 1000)
+            if adventure.candles is None:
+                return None
+            return adventure.candles.slice_time(start_time * 1000, end_time * 1000)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            adventure = self.current()
+            if adventure is None:
+                continue
+            try:
+                with adventure.lock:
+                    adventure.extend_to(int(time.time() * 1000))
+            except Exception as e:
+                logging.error(f"Error updating adventure candles: {e}")
+
+adventure_tracker = AdventureTracker()
@@ -0,0 +1,309 @@
+import asyncio
+import functools
+import logging
+import time
+import aiohttp
+from telebot import apihelper, asyncio_helper
+from telebot.async_telebot import AsyncTeleBot
+from config import (
+    BOT_TOKEN, BACKOFF_FACTOR, STREAM_TIMEOUT, POLLING_TIMEOUT, SSE_URL,
+    SSE_BACKOFF_MAX,
+    AUTHORIZED_USERS, AUTHORIZED_GROUPS, SHOW_BTC_CHARTS,
+    ASYNC_MAX_CONCURRENT_SENDS, OUTBOX_POLL_INTERVAL
+)
+from state import pepito_state
+from bot_handlers import (
+    get_status_caption, get_cached_file_id, remember_file_id,
+    forget_file_id, get_sent_file_id
+)
+from event_pipeline import (
+    parse_pepito_event, store_event, prepare_chart, describe_event, log_timings
+)
+from command_handlers import register_handlers
+from sse import SSEParser, reconnect_delay
+from outbox import outbox
+
+async def run_blocking(func, *args, **kwargs):
+    """asyncio.to_thread equivalent that also runs on Python 3.8"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+class SyncBotBridge:
+    """Lets the existing synchronous command handlers drive an AsyncTeleBot.
+
+    Handlers run in worker threads; every Bot API call they make is
+    scheduled on the event loop, so all Telegram I/O shares one loop and
+    one HTTP session.
+    """
+
+    def __init__(self, bot, loop):
+        self._bot = bot
+        self._loop = loop
+
+    def message_handler(self, *args, **kwargs):
+        def decorator(handler):
+            async def run_in_thread(message):
+                await run_blocking(handler, message)
+
+            self._bot.message_handler(*args, **kwargs)(run_in_thread)
+            return handler
+        return decorator
+
+    def __getattr__(self, name):
+        method = getattr(self._bot, name)
+
+        def call(*args, **kwargs):
+            future = asyncio.run_coroutine_threadsafe(method(*args, **kwargs), self._loop)
+            try:
+                return future.result()
+            except asyncio_helper.ApiTelegramException as e:
+                # Handlers catch the synchronous API exception type
+                raise apihelper.ApiTelegramException(e.function_name, e.result, e.result_json) from e
+        return call
+
+async def download_photo_async(session, photo_url):
+    """Download an event photo, returning its bytes or None."""
+    if await run_blocking(get_cached_file_id, photo_url):
+        return None
+
+    try:
+        async with session.get(photo_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+            response.raise_for_status()
+            return await response.read()
+    except Exception as e:
+        logging.error(f"Error downloading photo: {e}")
+        return None
+
+async def broadcast_photo(bot, recipients, source, photo_bytes, caption_for):
+    """Upload a photo once, then fan its file_id out to every recipient concurrently.
+
+    Returns {chat_id: delivered}.
+    """
+    semaphore = asyncio.Semaphore(ASYNC_MAX_CONCURRENT_SENDS)
+    pending = list(recipients)
+    results = {}
+    file_id = await run_blocking(get_cached_file_id, source) if source else None
+
+    if not file_id and photo_bytes and pending:
+        chat_id = pending.pop(0)
+        try:
+            sent = await bot.send_photo(
+                chat_id, photo_bytes, caption=caption_for(chat_id), parse_mode='HTML'
+            )
+            file_id = get_sent_file_id(sent)
+            results[chat_id] = True
+            if source:
+                await run_blocking(remember_file_id, source, file_id)
+        except Exception as e:
+            logging.error(f"Error sending photo to {chat_id}: {e}")
+            results[chat_id] = False
+
+    async def send(chat_id):
+        async with semaphore:
+            try:
+                if file_id or photo_bytes:
+                    await bot.send_photo(
+                        chat_id, file_id or photo_bytes,
+                        caption=caption_for(chat_id), parse_mode='HTML'
+                    )
+                else:
+                    await bot.send_message(
+                        chat_id, f"{caption_for(chat_id)}\n\n⚠️ Image unavailable",
+                        parse_mode='HTML'
+                    )
+                results[chat_id] = True
+            except asyncio_helper.ApiTelegramException as e:
+                logging.error(f"Error sending photo to {chat_id}: {e}")
+                results[chat_id] = False
+                if file_id and source and 'file' in e.description.lower():
+                    await run_blocking(forget_file_id, source)
+            except Exception as e:
+                logging.error(f"Error sending photo to {chat_id}: {e}")
+                results[chat_id] = False
+
+    await asyncio.gather(*(send(chat_id) for chat_id in pending))
+    return results
+
+async def broadcast_chart(bot, recipients, chart):
+    """Send a RenderedChart to every recipient, uploading its PNG at most once.
+
+    Returns {chat_id: delivered}.
+    """
+    semaphore = asyncio.Semaphore(ASYNC_MAX_CONCURRENT_SENDS)
+    pending = list(recipients)
+    results = {}
+
+    if chart.file_id is None and pending:
+        chat_id = pending.pop(0)
+        try:
+            sent = await bot.send_photo(chat_id, chart.png, caption=chart.caption, parse_mode='HTML')
+            chart.file_id = get_sent_file_id(sent)
+            results[chat_id] = True
+        except Exception as e:
+            logging.error(f"Error sending BTC chart to {chat_id}: {e}")
+            results[chat_id] = False
+
+    async def send(chat_id):
+        async with semaphore:
+            try:
+                await bot.send_photo(
+                    chat_id, chart.file_id or chart.png,
+                    caption=chart.caption, parse_mode='HTML'
+                )
+                results[chat_id] = True
+            except Exception as e:
+                logging.error(f"Error sending BTC chart to {chat_id}: {e}")
+                results[chat_id] = False
+
+    await asyncio.gather(*(send(chat_id) for chat_id in pending))
+    return results
+
+async def timed_async(timings, stage, awaitable):
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[stage] = time.perf_counter() - start
+
+async def process_event_async(bot, session, entry):
+    """Async counterpart of main.process_event: overlapped stages, concurrent delivery"""
+    timings = {}
+    started = time.perf_counter()
+    outbox_id, event_type, event_time, img_url = entry
+
+    # May load the state or query the sessions table; keep it off the loop
+    prev_event = await run_blocking(pepito_state.get_previous_opposite_event, event_type, event_time)
+    time_str, duration_str = describe_event(event_time, prev_event)
+    with_chart = bool(prev_event and SHOW_BTC_CHARTS)
+
+    recipients = AUTHORIZED_USERS + AUTHORIZED_GROUPS
+    await run_blocking(outbox.add_deliveries, outbox_id, 'photo', recipients)
+    if with_chart:
+        await run_blocking(outbox.add_deliveries, outbox_id, 'chart', recipients)
+    photo_recipients = await run_blocking(outbox.pending_deliveries, outbox_id, 'photo')
+    chart_recipients = []
+    if with_chart:
+        chart_recipients = await run_blocking(outbox.pending_deliveries, outbox_id, 'chart')
+
+    db_task = asyncio.create_task(timed_async(
+        timings, 'db', run_blocking(store_event, event_type, event_time, img_url)
+    ))
+    photo_task = None
+    if photo_recipients:
+        photo_task = asyncio.create_task(timed_async(
+            timings, 'photo', download_photo_async(session, img_url)
+        ))
+    chart_task = None
+    if chart_recipients:
+        # Candle store and renderer are synchronous; run them off the loop
+        chart_task = asyncio.create_task(run_blocking(
+            prepare_chart, timings, prev_event[2], event_time, duration_str, event_type
+        ))
+
+    if photo_task:
+        photo_bytes = await photo_task
+        results = await timed_async(timings, 'photo_delivery', broadcast_photo(
+            bot, photo_recipients, img_url, photo_bytes,
+            lambda chat_id: get_status_caption(chat_id, event_type, time_str, duration_str)
+        ))
+        await run_blocking(outbox.record_deliveries, outbox_id, 'photo', results)
+
+    if chart_task:
+        chart = await chart_task
+        if chart:
+            results = await timed_async(
+                timings, 'chart_delivery', broadcast_chart(bot, chart_recipients, chart)
+            )
+            await run_blocking(outbox.record_deliveries, outbox_id, 'chart', results)
+        else:
+            await run_blocking(outbox.skip_deliveries, outbox_id, 'chart')
+
+    # Awaited last so delivery never queues behind the write
+    await db_task
+
+    timings['total'] = time.perf_counter() - started
+    log_timings(timings)
+
+async def listen_to_sse_async(session):
+    """Resumable SSE listener on the shared aiohttp session"""
+    timeout = aiohttp.ClientTimeout(total=None, sock_read=STREAM_TIMEOUT)
+    last_event_id = None
+    retry_ms = None
+    attempt = 0
+    while True:
+        try:
+            headers = {'Accept': 'text/event-stream'}
+            if last_event_id:
+                headers['Last-Event-ID'] = last_event_id
+            logging.info(f"Connecting to SSE stream (Last-Event-ID: {last_event_id})...")
+            async with session.get(SSE_URL, timeout=timeout, headers=headers) as response:
+                response.raise_for_status()
+
+                parser = SSEParser(last_event_id)
+                async for chunk in response.content.iter_any():
+                    for event in parser.feed(chunk):
+                        attempt = 0
+                        data = parse_pepito_event(event)
+                        if data:
+                            # Blocks (off the loop) while the outbox is full
+                            await run_blocking(outbox.put, data)
+                        # Resume after the last event handled; the parser may
+                        # already hold the id of a frame that is not complete
+                        last_event_id = event.id
+                    retry_ms = parser.retry or retry_ms
+            logging.warning("SSE stream closed by server")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"SSE connection error: {e}")
+
+        base = retry_ms / 1000 if retry_ms else BACKOFF_FACTOR * 2
+        delay = reconnect_delay(attempt, base, SSE_BACKOFF_MAX)
+        attempt += 1
+        logging.info(f"Reconnecting to SSE stream in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+async def process_events_async(bot, session):
+    """Claim events from the outbox in batches and process them in order"""
+    await run_blocking(outbox.recover)
+    while True:
+        try:
+            batch = await run_blocking(outbox.claim)
+        except Exception as e:
+            logging.error(f"Error claiming events: {e}")
+            batch = None
+        if not batch:
+            await asyncio.sleep(OUTBOX_POLL_INTERVAL)
+            continue
+
+        for entry in batch:
+            try:
+                await process_event_async(bot, session, entry)
+                await run_blocking(outbox.complete, entry[0])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Error processing event: {e}")
+                await run_blocking(outbox.release, entry[0])
+
+async def main_async():
+    bot = AsyncTeleBot(BOT_TOKEN)
+    register_handlers(SyncBotBridge(bot, asyncio.get_running_loop()))
+
+    async with aiohttp.ClientSession() as session:
+        tasks = [
+            asyncio.create_task(listen_to_sse_async(session)),
+            asyncio.create_task(process_events_async(bot, session))
+        ]
+        logging.info("Bot is ready! Starting async polling...")
+        try:
+            await bot.infinity_polling(timeout=POLLING_TIMEOUT)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await bot.close_session()
+
+def run_async():
+    """Entry point for RUNTIME_MODE=asyncio"""
+    asyncio.run(main_async())
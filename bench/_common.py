@@ -0,0 +1,20 @@
+"""Shared setup for the benchmark scripts in bench/.
+
+Import this before any bot module: it puts the repository root on
+sys.path and points DB_FILE at a throwaway database unless one is set.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ.setdefault('DB_FILE', os.path.join(tempfile.mkdtemp(prefix='pepito-bench-'), 'bench.db'))
+
+import logging
+logging.disable(logging.INFO)
+
+def report(name, value, unit):
+    print(f"{name:<40} {value:>12,.1f} {unit}")
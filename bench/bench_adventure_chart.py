@@ -0,0 +1,89 @@
+"""First-chart latency for a finished adventure, with and without the tracker.
+
+The exchange is a stand-in that serves generated 1m candles after a fixed
+delay per request, like a remote API. Untracked, the closing event fetches
+the whole adventure. Tracked, the adventure already holds every candle up
+to a minute before the close, as the tracker's background thread leaves
+it, so only the tail is fetched. Each case starts from an empty candle
+cache and renders with the raster backend.
+
+    python bench/bench_adventure_chart.py [--hours 6 72] [--delay 0.15]
+"""
+import argparse
+import os
+import time
+
+import _common
+
+os.environ.setdefault('CHART_BACKEND', 'raster')
+# Time the render itself, not the pool's inter-process hand-off
+os.environ.setdefault('RENDER_POOL_SIZE', '0')
+
+from adventure_tracker import adventure_tracker
+from bot_handlers import get_chart_generator
+from database import DatabaseManager
+from event_pipeline import prepare_chart
+
+MINUTE_MS = 60_000
+
+class SlowExchange:
+    rateLimit = 0
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.requests = 0
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        self.requests += 1
+        time.sleep(self.delay)
+        rows = []
+        for ts in range(since, since + (limit or 500) * MINUTE_MS, MINUTE_MS):
+            price = 40_000.0 + ts // MINUTE_MS % 240
+            rows.append([ts, price, price + 20, price - 20, price + 5, 1.0])
+        return rows
+
+def first_chart(exchange, start_time, end_time, tracked):
+    """Seconds from the closing event to a rendered chart, and exchange requests made."""
+    conn = DatabaseManager.get_connection()
+    conn.execute("DELETE FROM candles")
+    conn.commit()
+
+    if tracked:
+        adventure_tracker.begin('out', start_time)
+        adventure = adventure_tracker.current()
+        with adventure.lock:
+            adventure.extend_to((end_time - 60) * 1000)
+
+    exchange.requests = 0
+    started = time.perf_counter()
+    chart = prepare_chart({}, start_time, end_time, f"{(end_time - start_time) // 3600}h 0m", 'in')
+    elapsed = time.perf_counter() - started
+    assert chart is not None, "chart was not rendered"
+    return elapsed, exchange.requests
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hours', type=int, nargs='+', default=[6, 72])
+    parser.add_argument('--delay', type=float, default=0.15, help="seconds per exchange request")
+    args = parser.parse_args()
+
+    DatabaseManager.init_db()
+    exchange = SlowExchange(args.delay)
+    get_chart_generator().exchange = exchange
+    # An hour in the past, so every candle of the adventure is closed
+    end_time = (int(time.time()) // 60 - 60) * 60
+
+    try:
+        # Untimed: loads fonts and the chart modules once for every case
+        first_chart(exchange, end_time - 3600, end_time, tracked=False)
+        for hours in args.hours:
+            start_time = end_time - hours * 3600
+            for tracked in (False, True):
+                elapsed, requests = first_chart(exchange, start_time, end_time, tracked)
+                label = f"{hours}h adventure, {'tracked' if tracked else 'untracked'}"
+                _common.report(f"{label} ({requests} req)", elapsed * 1000, "ms")
+    finally:
+        adventure_tracker.stop()
+
+if __name__ == "__main__":
+    main()
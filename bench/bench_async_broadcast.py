@@ -0,0 +1,59 @@
+"""Delivery latency of one event broadcast to many chats.
+
+A fake AsyncTeleBot answers every send after a fixed delay, standing in
+for Telegram's round trip. The first send uploads the photo; the rest
+reuse its file_id, ASYNC_MAX_CONCURRENT_SENDS at a time.
+
+    python bench/bench_async_broadcast.py [--chats 500] [--send-ms 50]
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+import _common
+from config import ASYNC_MAX_CONCURRENT_SENDS
+from async_runtime import broadcast_photo
+
+class FakeAsyncBot:
+    def __init__(self, send_seconds):
+        self.send_seconds = send_seconds
+        self.sent = 0
+        self.latencies = []
+        self._started = None
+
+    async def send_photo(self, chat_id, photo, caption=None, parse_mode=None):
+        await asyncio.sleep(self.send_seconds)
+        self.sent += 1
+        self.latencies.append(time.perf_counter() - self._started)
+        return SimpleNamespace(photo=[SimpleNamespace(file_id='fake-file-id')])
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        return await self.send_photo(chat_id, None)
+
+async def run(chats, send_seconds):
+    bot = FakeAsyncBot(send_seconds)
+    bot._started = time.perf_counter()
+    results = await broadcast_photo(
+        bot, list(range(1, chats + 1)), None, b'photo-bytes', lambda chat_id: "caption"
+    )
+    elapsed = time.perf_counter() - bot._started
+    assert all(results.values()) and len(results) == chats
+    return elapsed, sorted(bot.latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chats', type=int, default=500)
+    parser.add_argument('--send-ms', type=float, default=50)
+    args = parser.parse_args()
+
+    elapsed, latencies = asyncio.run(run(args.chats, args.send_ms / 1000))
+
+    print(f"{args.chats} chats, {args.send_ms:.0f} ms per send, "
+          f"{ASYNC_MAX_CONCURRENT_SENDS} concurrent sends")
+    _common.report("sequential sends (estimate)", args.chats * args.send_ms / 1000, "s")
+    _common.report("async broadcast, last delivery", elapsed, "s")
+    _common.report("async broadcast, median delivery", latencies[len(latencies) // 2], "s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Resample and render-prep time: pandas DataFrame vs Candles.
+
+Both paths take the same 1m rows from the synthetic test fixture (tiled forward in
+time to the requested length), resample them to a chart timeframe and
+pull out what the renderers need: price change, high/low and the columns
+as lists. The pandas path is the DataFrame prep the charts used before
+Candles, with df.resample doing the aggregation. pandas is no longer a
+dependency; install it to compare.
+
+    python bench/bench_candles.py [--minutes 4320] [--timeframe 15m] [--repeat 50]
+"""
+import argparse
+import json
+import os
+import time
+
+import _common
+from candle_store import timeframe_to_ms
+from candles import Candles
+
+FIXTURE = os.path.join(_common.ROOT, 'tests', 'fixtures', 'synthetic_btcusdt_ohlcv.json')
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+def load_rows(minutes):
+    """The fixture's 1m rows, repeated back to back until `minutes` rows."""
+    with open(FIXTURE) as f:
+        base = json.load(f)['1m']
+    span = base[-1][0] - base[0][0] + 60_000
+    rows = []
+    while len(rows) < minutes:
+        shift = span * (len(rows) // len(base))
+        rows.extend([row[0] + shift] + row[1:] for row in base)
+    return rows[:minutes]
+
+def prep_pandas(pd, rows, step_ms):
+    df = pd.DataFrame(rows, columns=COLUMNS)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df = df.resample(pd.Timedelta(milliseconds=step_ms), on='timestamp').agg({
+        'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
+    }).dropna().reset_index()
+    start_price = df['open'].iloc[0]
+    end_price = df['close'].iloc[-1]
+    price_change = (end_price - start_price) / start_price * 100
+    highs = df['high'].tolist()
+    lows = df['low'].tolist()
+    return (
+        price_change, max(highs), min(lows),
+        df['open'].tolist(), highs, lows, df['close'].tolist(), list(df['timestamp'])
+    )
+
+def prep_candles(rows, step_ms):
+    candles = Candles.from_ohlcv(rows).resample(step_ms)
+    price_change = candles.price_change()[2]
+    high, low = candles.high_low()
+    return (
+        price_change, high, low,
+        candles.open.tolist(), candles.high.tolist(), candles.low.tolist(),
+        candles.close.tolist(), candles.datetimes()
+    )
+
+def best_ms(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--minutes', type=int, default=4320, help="1m rows (default: a 72 h adventure)")
+    parser.add_argument('--timeframe', default='15m')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    rows = load_rows(args.minutes)
+    step_ms = timeframe_to_ms(args.timeframe)
+    label = f"{args.minutes} x 1m -> {args.timeframe}"
+
+    try:
+        import pandas as pd
+    except ImportError:
+        pd = None
+        print("pandas is not installed; only the Candles path is measured")
+
+    if pd is not None:
+        # Same candles either way, or the comparison means nothing
+        expected = prep_pandas(pd, rows, step_ms)
+        actual = prep_candles(rows, step_ms)
+        assert expected[:7] == actual[:7], "pandas and Candles disagree"
+        _common.report(f"pandas, {label}", best_ms(lambda: prep_pandas(pd, rows, step_ms), args.repeat), "ms")
+    _common.report(f"Candles, {label}", best_ms(lambda: prep_candles(rows, step_ms), args.repeat), "ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Chart render time and peak memory for the Plotly and raster backends.
+
+Each (backend, candles) case runs in a fresh interpreter so peak memory
+is not inherited from the previous case. Peak RSS is sampled from /proc
+across the process and its children (Kaleido's Chromium), so Linux only.
+
+    python bench/bench_chart_backends.py [--sizes 100 500 2000] [--renders 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import _common
+
+def tree_rss_kb(root_pid):
+    """Resident set size of root_pid and all of its descendants, in KB."""
+    children = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(name))
+
+    total = 0
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+                        break
+        except OSError:
+            pass
+    return total
+
+class PeakSampler(threading.Thread):
+    def __init__(self, interval=0.01):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_kb = 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            self.peak_kb = max(self.peak_kb, tree_rss_kb(os.getpid()))
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.peak_kb = max(self.peak_kb, tree_rss_kb(os.getpid()))
+
+def synthetic_candles(count):
+    from candles import Candles
+    start_ms = 1_700_000_000_000
+    rows = []
+    price = 40_000.0
+    for i in range(count):
+        step = ((i * 7919) % 200 - 100) / 2
+        rows.append([start_ms + i * 60_000, price, price + 40, price - 40, price + step, 1.0])
+        price += step
+    return Candles.from_ohlcv(rows)
+
+def run_case(backend, count, renders):
+    """Child process: render `renders` charts and print the measurements as JSON."""
+    os.environ['CHART_BACKEND'] = backend
+    # Measure the render itself, not the pool's inter-process hand-off
+    os.environ['RENDER_POOL_SIZE'] = '0'
+    sampler = PeakSampler()
+    sampler.start()
+
+    from chart_generator import BitcoinChartGenerator
+    generator = BitcoinChartGenerator()
+    candles = synthetic_candles(count)
+    start, end = candles.timestamp[0] / 1000, candles.timestamp[-1] / 1000
+
+    # The first render pays the imports and, for Plotly, the Kaleido start-up
+    generator.create_chart_for_period(start, end, '', 'out', candles=candles)
+    timings = []
+    for _ in range(renders):
+        started = time.perf_counter()
+        image = generator.create_chart_for_period(start, end, '', 'out', candles=candles)
+        timings.append(time.perf_counter() - started)
+        assert image is not None, "render failed"
+
+    sampler.stop()
+    timings.sort()
+    print(json.dumps({'median_ms': timings[len(timings) // 2] * 1000, 'peak_mb': sampler.peak_kb / 1024}))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 2000])
+    parser.add_argument('--renders', type=int, default=5)
+    parser.add_argument('--case', nargs=2, metavar=('BACKEND', 'CANDLES'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(args.case[0], int(args.case[1]), args.renders)
+        return
+
+    print(f"{'backend':<8} {'candles':>8} {'median ms':>10} {'peak MB':>9}")
+    for backend in ('plotly', 'raster'):
+        for count in args.sizes:
+            output = subprocess.run(
+                [sys.executable, __file__, '--case', backend, str(count), '--renders', str(args.renders)],
+                capture_output=True, text=True, check=True
+            ).stdout.strip().splitlines()[-1]
+            result = json.loads(output)
+            print(f"{backend:<8} {count:>8} {result['median_ms']:>10.1f} {result['peak_mb']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
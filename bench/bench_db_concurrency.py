@@ -0,0 +1,73 @@
+"""Queries per second under concurrent command load.
+
+Several threads issue the /status and /stats query mix at once, first
+through DatabaseManager's persistent per-thread connections and then
+with a connection opened and closed per query, as the bot did before.
+
+    python bench/bench_db_concurrency.py [--threads 8] [--seconds 3] [--events 50000]
+"""
+import argparse
+import sqlite3
+import threading
+import time
+
+import _common
+from config import DB_FILE
+from database import DatabaseManager, LAST_EVENT_BY_TYPE_SQL, LAST_EVENT_SQL, PREVIOUS_EVENT_BY_TYPE_SQL
+
+def seed(events):
+    DatabaseManager.init_db()
+    conn = DatabaseManager.get_connection()
+    conn.executemany(
+        "INSERT OR IGNORE INTO events (type, time, img) VALUES (?, ?, ?)",
+        [('in' if i % 2 else 'out', 1_600_000_000 + i * 60, 'url') for i in range(events)]
+    )
+    DatabaseManager.rebuild_sessions(conn)
+    conn.commit()
+
+def command_mix_persistent():
+    DatabaseManager.get_last_event('in')
+    DatabaseManager.get_last_event('out')
+    DatabaseManager.get_location_stats()
+
+def command_mix_per_call():
+    for sql, params in ((LAST_EVENT_BY_TYPE_SQL, ('in',)), (LAST_EVENT_BY_TYPE_SQL, ('out',))):
+        conn = sqlite3.connect(DB_FILE)
+        conn.execute(sql, params).fetchone()
+        conn.close()
+    conn = sqlite3.connect(DB_FILE)
+    last = conn.execute(LAST_EVENT_SQL).fetchone()
+    conn.execute(PREVIOUS_EVENT_BY_TYPE_SQL, ('out' if last[0] == 'in' else 'in', last[1])).fetchone()
+    conn.close()
+
+def run(command_mix, threads, seconds, queries_per_mix):
+    stop = time.monotonic() + seconds
+    counts = [0] * threads
+
+    def worker(index):
+        while time.monotonic() < stop:
+            command_mix()
+            counts[index] += queries_per_mix
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return sum(counts) / seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--events', type=int, default=50000)
+    args = parser.parse_args()
+
+    seed(args.events)
+    _common.report(f"per-call connections ({args.threads} threads)",
+                   run(command_mix_per_call, args.threads, args.seconds, 4), "queries/s")
+    _common.report(f"persistent connections ({args.threads} threads)",
+                   run(command_mix_persistent, args.threads, args.seconds, 3), "queries/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Event insert throughput: group commit vs log_event.
+
+    python bench/bench_event_writer.py [--events 5000] [--producers 8]
+"""
+import argparse
+import threading
+import time
+
+import _common
+from database import DatabaseManager
+from event_writer import EventWriter
+
+def events(offset, count):
+    return [('in' if i % 2 else 'out', offset + i, 'url') for i in range(count)]
+
+def reset():
+    conn = DatabaseManager.get_connection()
+    conn.execute("DELETE FROM events")
+    conn.execute("DELETE FROM sessions")
+    conn.commit()
+
+def log_event_loop(count):
+    started = time.perf_counter()
+    for event in events(0, count):
+        DatabaseManager.log_event(*event)
+    return count / (time.perf_counter() - started)
+
+def log_event_threads(count, producers):
+    """Producers that each call log_event on their own connection."""
+    per_producer = count // producers
+
+    def produce(index):
+        for i in range(per_producer):
+            event_time = i * producers + index
+            DatabaseManager.log_event('in' if event_time % 2 else 'out', event_time, 'url')
+
+    threads = [threading.Thread(target=produce, args=(i,)) for i in range(producers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return per_producer * producers / (time.perf_counter() - started)
+
+def writer_bulk(count):
+    writer = EventWriter()
+    started = time.perf_counter()
+    futures = writer.submit_many(events(0, count))
+    assert all(future.result() for future in futures)
+    rate = count / (time.perf_counter() - started)
+    writer.stop()
+    return rate
+
+def writer_waiting_producers(count, producers):
+    """Producers that each wait for their commit, as store_event does."""
+    writer = EventWriter()
+    per_producer = count // producers
+
+    def produce(index):
+        # Interleaved times keep arrivals roughly in order, as live events are
+        for i in range(per_producer):
+            event_time = i * producers + index
+            assert writer.submit('in' if event_time % 2 else 'out', event_time, 'url').result()
+
+    threads = [threading.Thread(target=produce, args=(i,)) for i in range(producers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    rate = per_producer * producers / (time.perf_counter() - started)
+    writer.stop()
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--producers', type=int, default=8)
+    args = parser.parse_args()
+
+    DatabaseManager.init_db()
+    cases = [
+        ("log_event loop", lambda: log_event_loop(args.events)),
+        (f"log_event, {args.producers} threads",
+         lambda: log_event_threads(args.events, args.producers)),
+        ("writer, bulk submit_many", lambda: writer_bulk(args.events)),
+        (f"writer, {args.producers} waiting producers",
+         lambda: writer_waiting_producers(args.events, args.producers)),
+    ]
+    for name, run in cases:
+        reset()
+        _common.report(name, run(), "events/s")
+
+if __name__ == "__main__":
+    main()
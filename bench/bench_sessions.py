@@ -0,0 +1,83 @@
+"""Sessions table rebuild and check over a large synthetic history.
+
+Compares DatabaseManager.rebuild_sessions (streaming build_sessions)
+with a rebuild written as one window-function query.
+
+    python bench/bench_sessions.py [--events 1000000]
+"""
+import argparse
+import random
+import time
+
+import _common
+from database import DatabaseManager
+
+WINDOW_REBUILD_SQL = """
+    INSERT INTO sessions (location, start_time, end_time, duration, last_time, last_event_id)
+    WITH marked AS (
+        SELECT id, type, time,
+               CASE WHEN type = LAG(type) OVER (ORDER BY time, id) THEN 0 ELSE 1 END AS new_run
+        FROM events
+    ), runs AS (
+        SELECT id, type, time, SUM(new_run) OVER (ORDER BY time, id) AS run FROM marked
+    ), grouped AS (
+        -- SQLite takes the bare id from the row holding MAX(time)
+        SELECT run, type, MIN(time) AS start_time, MAX(time) AS last_time, id AS last_event_id
+        FROM runs GROUP BY run
+    )
+    SELECT type, start_time,
+           LEAD(start_time) OVER (ORDER BY run),
+           LEAD(start_time) OVER (ORDER BY run) - start_time,
+           last_time, last_event_id
+    FROM grouped ORDER BY run
+"""
+
+def seed(count):
+    rng = random.Random(25)
+    rows = []
+    event_type = 'in'
+    event_time = 1_500_000_000
+    while len(rows) < count:
+        for _ in range(rng.choice((1, 1, 2, 3))):
+            event_time += rng.randint(30, 7200)
+            rows.append((event_type, event_time, 'url'))
+        event_type = 'out' if event_type == 'in' else 'in'
+    DatabaseManager.init_db()
+    conn = DatabaseManager.get_connection()
+    conn.executemany("INSERT INTO events (type, time, img) VALUES (?, ?, ?)", rows[:count])
+    conn.commit()
+
+def timed(name, func):
+    started = time.perf_counter()
+    result = func()
+    _common.report(name, time.perf_counter() - started, "s")
+    return result
+
+def rebuild_python(conn):
+    written = DatabaseManager.rebuild_sessions(conn)
+    conn.commit()
+    return written
+
+def rebuild_sql(conn):
+    conn.execute("DELETE FROM sessions")
+    written = conn.execute(WINDOW_REBUILD_SQL).rowcount
+    conn.commit()
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    timed(f"insert {args.events:,} events", lambda: seed(args.events))
+    conn = DatabaseManager.get_connection()
+
+    sessions = timed("rebuild_sessions (Python)", lambda: rebuild_python(conn))
+    print(f"{'':<40} {sessions:>12,} sessions")
+    assert timed("check_sessions", DatabaseManager.check_sessions) == []
+
+    assert timed("rebuild (window-function SQL)", lambda: rebuild_sql(conn)) == sessions
+    assert DatabaseManager.check_sessions() == []
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""SSE parsing throughput: SSEParser vs the old line loop.
+
+Synthetic pepito frames with periodic keep-alive comments are cut into
+fixed-size chunks, as iter_content delivers them, and parsed and
+JSON-decoded by each implementation.
+
+    python bench/bench_sse_parser.py [--frames 200000] [--chunk-size 4096]
+"""
+import argparse
+import json
+import time
+
+import _common
+from sse import SSEParser, json_loads
+
+def make_stream(frames):
+    parts = []
+    for i in range(frames):
+        if i % 50 == 0:
+            parts.append(b': keep-alive\n\n')
+        payload = json.dumps({
+            'event': 'pepito',
+            'type': 'in' if i % 2 else 'out',
+            'time': 1_700_000_000 + i,
+            'img': f'https://storage.thecatdoor.com/assets/{1_700_000_000 + i}.jpg'
+        })
+        parts.append(f'id: {i}\nevent: message\ndata: {payload}\n\n'.encode())
+    return b''.join(parts)
+
+def chunked(stream, size):
+    return [stream[i:i + size] for i in range(0, len(stream), size)]
+
+def iter_lines(chunks):
+    """requests.Response.iter_lines over pre-cut chunks."""
+    pending = None
+    for chunk in chunks:
+        if pending is not None:
+            chunk = pending + chunk
+        lines = chunk.splitlines()
+        if lines and lines[-1] and chunk and lines[-1][-1] == chunk[-1]:
+            pending = lines.pop()
+        else:
+            pending = None
+        yield from lines
+    if pending is not None:
+        yield pending
+
+def parse_old(chunks):
+    """The line loop main.py used before SSEParser."""
+    events = 0
+    for line in iter_lines(chunks):
+        if line:
+            try:
+                line = line.decode("utf-8").lstrip("data: ").strip()
+                data = json.loads(line)
+                if data.get("event") == "pepito":
+                    events += 1
+            except json.JSONDecodeError:
+                continue
+    return events
+
+def parse_new(chunks):
+    parser = SSEParser()
+    events = 0
+    for chunk in chunks:
+        for event in parser.feed(chunk):
+            if json_loads(event.data).get("event") == "pepito":
+                events += 1
+    return events
+
+def measure(parse, chunks, frames):
+    started = time.perf_counter()
+    events = parse(chunks)
+    elapsed = time.perf_counter() - started
+    assert events == frames, f"{parse.__name__} parsed {events} of {frames} events"
+    return frames / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=200000)
+    parser.add_argument('--chunk-size', type=int, default=4096)
+    args = parser.parse_args()
+
+    chunks = chunked(make_stream(args.frames), args.chunk_size)
+    print(f"JSON decoder: {json_loads.__module__}")
+    _common.report("old line loop", measure(parse_old, chunks, args.frames), "events/s")
+    _common.report("SSEParser", measure(parse_new, chunks, args.frames), "events/s")
+
+if __name__ == "__main__":
+    main()
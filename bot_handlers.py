@@ -1,7 +1,10 @@
 import logging
+import threading
+import time
 import requests
 from datetime import datetime
 from telebot import types
+from telebot.apihelper import ApiTelegramException
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from config import (
@@ -15,7 +18,22 @@ from utils import (
     get_status_text
 )
 
-from chart_generator import BitcoinChartGenerator
+from candle_store import select_timeframe
+from chart_cache import satoshi_chart_cache, satoshi_chart_key
+from database import DatabaseManager
+from singleflight import flight
+
+# Telegram file_ids by media source, backed by the telegram_files table
+_file_ids = {}
+_file_ids_lock = threading.Lock()
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+_chart_generator = None
+_chart_generator_lock = threading.Lock()
+
+_candle_feed = None
 
 # Menu Keyboard Creation
 def get_menu_keyboard():
@@ -63,52 +81,263 @@ def is_group_admin(user_id, chat_id):
         return False
 
 # Message Sending Functions
-def send_telegram_photo_with_caption(bot, chat_id, photo_url, caption):
+def get_status_caption(chat_id, event_type, time_str, duration_str=None):
+    """Build the caption broadcast with a cat-door event photo."""
+    caption = (
+        f"{'🏠' if event_type == 'in' else '🌳'} "
+        f"<b>Pépito is {'back home' if event_type == 'in' else 'out'}!</b>\n\n"
+        f"🐾🐾🐾  🐾🐾🐾  🐾🐾🐾\n\n"
+        f"Time: {time_str}"
+    )
+    if duration_str:
+        caption += (
+            f"\n{'Outdoor' if event_type == 'in' else 'Indoor'} "
+            f"duration: {duration_str}"
+        )
+    return caption
+
+# Telegram file_id Reuse
+def get_cached_file_id(source):
+    """Return the Telegram file_id already uploaded for a media source."""
+    with _file_ids_lock:
+        file_id = _file_ids.get(source)
+    if file_id:
+        return file_id
+
+    file_id = DatabaseManager.get_file_id(source)
+    if file_id:
+        with _file_ids_lock:
+            _file_ids[source] = file_id
+    return file_id
+
+def remember_file_id(source, file_id):
+    """Store the file_id returned by an upload for later sends."""
+    if not file_id:
+        return
+    with _file_ids_lock:
+        _file_ids[source] = file_id
+    DatabaseManager.save_file_id(source, file_id)
+
+def forget_file_id(source):
+    """Drop a file_id Telegram no longer accepts."""
+    with _file_ids_lock:
+        _file_ids.pop(source, None)
+    DatabaseManager.delete_file_id(source)
+
+def get_sent_file_id(sent_message):
+    """Extract the file_id of the media in a sent message."""
+    if sent_message is None:
+        return None
+    if getattr(sent_message, 'photo', None):
+        # Largest size is last
+        return sent_message.photo[-1].file_id
+    for attr in ('animation', 'video', 'document'):
+        media = getattr(sent_message, attr, None)
+        if media:
+            return media.file_id
+    return None
+
+def download_photo(photo_url):
+    """Download an event photo, returning its bytes or None on failure."""
+    if get_cached_file_id(photo_url):
+        # Already on Telegram's servers; no need to move the bytes again
+        return None
+
+    # Concurrent /status or /stats for the same photo share one download
+    return flight.do(('photo', photo_url), _fetch_photo, photo_url)
+
+def _fetch_photo(photo_url):
     try:
-        img_response = requests.get(photo_url, timeout=10)
+        img_response = get_http_session().get(photo_url, timeout=10)
         img_response.raise_for_status()
+        return img_response.content
+    except Exception as e:
+        logging.error(f"Error downloading photo: {e}")
+        return None
+
+def send_telegram_photo_with_caption(bot, chat_id, photo_url, caption, photo_bytes=None):
+    """Send a photo (or a text fallback); returns True if the chat got the update."""
+    try:
+        file_id = get_cached_file_id(photo_url)
+        if file_id:
+            try:
+                bot.send_photo(
+                    chat_id=chat_id,
+                    photo=file_id,
+                    caption=caption,
+                    parse_mode='HTML'
+                )
+                logging.info(f"Successfully sent cached photo to chat {chat_id}")
+                return True
+            except ApiTelegramException as e:
+                logging.warning(f"Cached file_id rejected, re-uploading: {e}")
+                forget_file_id(photo_url)
+
+        if photo_bytes is None:
+            photo_bytes = download_photo(photo_url)
+        if photo_bytes is None:
+            raise ValueError(f"Photo unavailable: {photo_url}")
         
-        bot.send_photo(
+        sent = bot.send_photo(
             chat_id=chat_id,
-            photo=img_response.content,
+            photo=photo_bytes,
             caption=caption,
             parse_mode='HTML'
         )
+        remember_file_id(photo_url, get_sent_file_id(sent))
         logging.info(f"Successfully sent photo to chat {chat_id}")
+        return True
     except Exception as e:
         logging.error(f"Error sending photo: {e}")
+
+    try:
         bot.send_message(
             chat_id=chat_id,
             text=f"{caption}\n\n⚠️ Image unavailable",
             parse_mode='HTML'
         )
+        return True
+    except Exception as e:
+        logging.error(f"Error sending fallback message to {chat_id}: {e}")
+        return False
+
+def send_media_file(bot, chat_id, item, caption):
+    """Send a catalog MediaItem, uploading the file only if Telegram lacks it."""
+    send = bot.send_animation if item.is_gif else bot.send_photo
+    file_id = get_cached_file_id(item.source)
+    if file_id:
+        try:
+            return send(chat_id, file_id, caption=caption, parse_mode='HTML')
+        except ApiTelegramException as e:
+            logging.warning(f"Cached file_id rejected, re-uploading {item.path}: {e}")
+            forget_file_id(item.source)
+
+    with open(item.path, 'rb') as media:
+        sent = send(chat_id, media, caption=caption, parse_mode='HTML')
+    remember_file_id(item.source, get_sent_file_id(sent))
+    return sent
+
+# Bitcoin Chart Functions
+class RenderedChart:
+    """A chart rendered once and shared by every chat it is sent to."""
 
-def send_btc_chart(bot, chat_id, start_time, end_time, duration_str, event_type):
+    def __init__(self, png, caption):
+        self.png = png
+        self.caption = caption
+        self.file_id = None
+        self._lock = threading.Lock()
+
+def get_chart_generator():
+    """Return the long-lived chart generator shared by all callers"""
+    global _chart_generator
+    with _chart_generator_lock:
+        if _chart_generator is None:
+            # Deferred: plotly and ccxt take most of the startup time
+            from chart_generator import BitcoinChartGenerator
+            _chart_generator = BitcoinChartGenerator()
+        return _chart_generator
+
+def prewarm_charting():
+    """Import the charting stack and build the generator ahead of the first chart."""
+    started = time.perf_counter()
+    try:
+        get_chart_generator()
+        logging.info(f"Charting stack pre-warmed in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        logging.error(f"Error pre-warming charting stack: {e}")
+
+def start_candle_feed():
+    """Start the background 1m candle feed that serves recent chart windows."""
+    global _candle_feed
+    from candle_feed import candle_feed
+    candle_feed.start()
+    _candle_feed = candle_feed
+
+def stop_candle_feed():
+    if _candle_feed is not None:
+        _candle_feed.stop()
+
+def fetch_btc_chart_data(start_time, end_time):
+    """Fetch the OHLCV data for a chart ahead of rendering it."""
+    return get_chart_generator().fetch_ohlcv_data(start_time, end_time)
+
+def get_btc_chart_caption(duration_str, event_type):
+    return (
+        f"📊 <b>Pépito is Satoshi</b>\n\n"
+        f"🐾🐾🐾  🐾🐾🐾  🐾🐾🐾\n\n"
+        f"During Pépito's {'Indoor' if event_type == 'out' else 'Outdoor'} Adventure\n"
+        f"Duration: {duration_str}"
+    )
+
+def render_btc_chart(start_time, end_time, duration_str, event_type, ohlcv=None):
+    """Render the chart PNG once; returns a RenderedChart or None"""
     if not SHOW_BTC_CHARTS:
-        return
+        return None
 
     try:
-        chart_gen = BitcoinChartGenerator()
-        img_bytes = chart_gen.create_chart_for_period(
-            start_time, end_time, duration_str, event_type
+        img_bytes = get_chart_generator().create_chart_for_period(
+            start_time, end_time, duration_str, event_type, candles=ohlcv
         )
-        
-        if img_bytes:
-            caption = (
-                f"📊 <b>Pépito is Satoshi</b>\n\n"
-                f"🐾🐾🐾  🐾🐾🐾  🐾🐾🐾\n\n"
-                f"During Pépito's {'Indoor' if event_type == 'out' else 'Outdoor'} Adventure\n"
-                f"Duration: {duration_str}"
-            )
-            
-            bot.send_photo(
-                chat_id=chat_id,
-                photo=img_bytes,
-                caption=caption,
-                parse_mode='HTML'
-            )
+        if not img_bytes:
+            return None
+        return RenderedChart(img_bytes.getvalue(), get_btc_chart_caption(duration_str, event_type))
+    except Exception as e:
+        logging.error(f"Error rendering BTC chart: {e}")
+        return None
+
+def send_rendered_chart(bot, chat_id, chart, caption=None):
+    """Send a rendered chart, reusing its file_id after the first upload; returns success"""
+    caption = caption or chart.caption
+    try:
+        # Serialize so concurrent senders upload the bytes at most once
+        with chart._lock:
+            if chart.file_id is None:
+                sent = bot.send_photo(
+                    chat_id=chat_id,
+                    photo=chart.png,
+                    caption=caption,
+                    parse_mode='HTML'
+                )
+                chart.file_id = get_sent_file_id(sent)
+                return True
+
+        bot.send_photo(
+            chat_id=chat_id,
+            photo=chart.file_id,
+            caption=caption,
+            parse_mode='HTML'
+        )
+        return True
     except Exception as e:
         logging.error(f"Error sending BTC chart: {e}")
+        return False
+
+def send_btc_chart(bot, chat_id, start_time, end_time, duration_str, event_type, ohlcv=None):
+    chart = render_btc_chart(start_time, end_time, duration_str, event_type, ohlcv=ohlcv)
+    if chart:
+        send_rendered_chart(bot, chat_id, chart)
+
+def _render_satoshi_chart(key, duration_str):
+    start_time, event_type, end_bucket = key
+    chart = satoshi_chart_cache.get(key)
+    if chart is None:
+        # Render up to the bucket boundary so the cached image matches its key
+        chart = render_btc_chart(start_time, end_bucket, duration_str, event_type)
+        if chart is not None:
+            satoshi_chart_cache.put(key, chart)
+    return chart
+
+def send_satoshi_chart(bot, chat_id, start_time, end_time, duration_str, event_type):
+    """Send the current-adventure chart, reusing a render from the same candle bucket"""
+    key = satoshi_chart_key(start_time, end_time, event_type, select_timeframe(end_time - start_time))
+    chart = satoshi_chart_cache.get(key)
+    if chart is None:
+        # Concurrent requests for the same bucket wait for a single render
+        chart = flight.do(('satoshi', key), _render_satoshi_chart, key, duration_str)
+        if chart is None:
+            return False
+
+    return send_rendered_chart(bot, chat_id, chart, caption=get_btc_chart_caption(duration_str, event_type))
 
 def notify_admin_of_unauthorized_access(bot, message):
     try:
@@ -143,6 +372,14 @@ def notify_admin_of_unauthorized_access(bot, message):
     except Exception as e:
         logging.error(f"Error in admin notification system: {e}")
 
+def get_http_session():
+    """Return the shared, pooled HTTP session used for downloads"""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            _http_session = create_session()
+        return _http_session
+
 def create_session():
     """Create requests session with retry strategy"""
     session = requests.Session()
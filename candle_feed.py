@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+import numpy as np
+from config import (
+    CANDLE_BUFFER_MINUTES, CANDLE_FEED_INTERVAL, CANDLE_FEED_MAX_LAG,
+    OHLCV_PAGE_LIMIT
+)
+from candle_store import candle_store, timeframe_to_ms, BASE_TIMEFRAME
+from candles import Candles
+
+SYMBOL = 'BTC/USDT'
+STEP_MS = timeframe_to_ms(BASE_TIMEFRAME)
+
+class CandleRingBuffer:
+    """Fixed-capacity, time-indexed store of the latest 1m candles.
+
+    Candle minute m lives in slot m % capacity of preallocated arrays, so
+    writes and window reads are plain vectorized indexing. A slot counts
+    only if its stored timestamp matches, which makes overwritten and
+    never-filled slots read as gaps.
+    """
+
+    def __init__(self, capacity=CANDLE_BUFFER_MINUTES):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._timestamp = np.full(capacity, -1, dtype=np.int64)
+        self._columns = np.zeros((5, capacity), dtype=np.float64)
+        self.latest_ts = None
+
+    def update(self, rows):
+        """Write ccxt OHLCV rows; newer data for a minute replaces older data."""
+        if not rows:
+            return
+        table = np.array(rows, dtype=np.float64)
+        timestamps = table[:, 0].astype(np.int64)
+        slots = (timestamps // STEP_MS) % self.capacity
+        with self._lock:
+            self._timestamp[slots] = timestamps
+            self._columns[:, slots] = table[:, 1:6].T
+            newest = int(timestamps.max())
+            if self.latest_ts is None or newest > self.latest_ts:
+                self.latest_ts = newest
+
+    def window(self, start_ms, end_ms, max_lag=CANDLE_FEED_MAX_LAG):
+        """Candles opening in [start_ms, end_ms], or None unless the buffer covers it all.
+
+        The newest max_lag minutes may be missing (not polled yet); the
+        window then ends at the latest buffered candle.
+        """
+        first = -(-start_ms // STEP_MS)
+        last = end_ms // STEP_MS
+        with self._lock:
+            if self.latest_ts is None:
+                return None
+            latest = self.latest_ts // STEP_MS
+            if last - latest > max_lag:
+                return None
+            last = min(last, latest)
+            if last < first or latest - first >= self.capacity:
+                return None
+
+            minutes = np.arange(first, last + 1, dtype=np.int64)
+            slots = minutes % self.capacity
+            timestamps = self._timestamp[slots]
+            if not np.array_equal(timestamps, minutes * STEP_MS):
+                return None
+            columns = self._columns[:, slots]
+        return Candles(timestamps, *columns)
+
+class CandleFeeder:
+    """Background poller keeping a CandleRingBuffer current.
+
+    Backfills the buffer once through the candle store, then fetches the
+    newest candles every CANDLE_FEED_INTERVAL seconds. Closed candles are
+    also saved to the store, so charts outside the buffer reuse them.
+    """
+
+    def __init__(self, buffer=None, interval=CANDLE_FEED_INTERVAL, exchange=None):
+        self.buffer = buffer or CandleRingBuffer()
+        self.interval = interval
+        self.exchange = exchange
+        self._stop = threading.Event()
+        self._thread = None
+        self._metrics_lock = threading.Lock()
+        self.last_poll_at = None
+        self.polls = 0
+        self.failures = 0
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        """Start the feeder thread (idempotent)."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='candle-feed', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def _get_exchange(self):
+        if self.exchange is None:
+            # Imported here so the bot can start before the exchange client
+            import ccxt
+            self.exchange = ccxt.binance()
+        return self.exchange
+
+    def backfill(self):
+        """Fill the whole buffer from the candle store (network only for missing ranges)."""
+        now_ms = int(time.time() * 1000)
+        start_ms = now_ms - (self.buffer.capacity - 1) * STEP_MS
+        rows = candle_store.get_candles(self._get_exchange(), SYMBOL, BASE_TIMEFRAME, start_ms, now_ms)
+        self.buffer.update(rows)
+        logging.info(f"Candle buffer backfilled with {len(rows)} candles")
+
+    def poll(self):
+        """Fetch the candles since the newest buffered one."""
+        exchange = self._get_exchange()
+        since = self.buffer.latest_ts
+        rows = exchange.fetch_ohlcv(SYMBOL, timeframe=BASE_TIMEFRAME, since=since, limit=OHLCV_PAGE_LIMIT)
+        self.buffer.update(rows)
+
+        now_ms = int(time.time() * 1000)
+        candle_store.save(SYMBOL, BASE_TIMEFRAME, [row for row in rows if row[0] + STEP_MS <= now_ms])
+        with self._metrics_lock:
+            self.polls += 1
+            self.last_poll_at = time.time()
+
+    def _run(self):
+        backfilled = False
+        while not self._stop.is_set():
+            try:
+                if not backfilled:
+                    self.backfill()
+                    backfilled = True
+                else:
+                    self.poll()
+            except Exception as e:
+                with self._metrics_lock:
+                    self.failures += 1
+                logging.error(f"Candle feed error: {e}")
+            self._stop.wait(self.interval)
+
+    def window(self, start_ms, end_ms):
+        """Serve a chart window from memory; None means fall back to the store."""
+        candles = self.buffer.window(start_ms, end_ms) if self.running else None
+        with self._metrics_lock:
+            if candles is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return candles
+
+    def get_metrics(self):
+        """Return freshness (seconds since the newest candle opened / last poll) and hit counters."""
+        now = time.time()
+        latest_ts = self.buffer.latest_ts
+        with self._metrics_lock:
+            total = self.hits + self.misses
+            return {
+                'latest_candle_age': now - latest_ts / 1000 if latest_ts is not None else None,
+                'since_last_poll': now - self.last_poll_at if self.last_poll_at else None,
+                'polls': self.polls,
+                'failures': self.failures,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0.0
+            }
+
+candle_feed = CandleFeeder()
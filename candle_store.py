@@ -0,0 +1,215 @@
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import OHLCV_PAGE_LIMIT, OHLCV_MAX_IN_FLIGHT, MAX_CHART_CANDLES
+from database import DatabaseManager
+
+TIMEFRAME_UNITS = {'m': 60, 'h': 3600, 'd': 86400}
+
+# Exchange-style timeframes charts can be resampled to, finest first
+BASE_TIMEFRAME = '1m'
+CHART_TIMEFRAMES = ['1m', '3m', '5m', '15m', '30m', '1h', '2h', '4h', '6h', '12h', '1d']
+
+def select_timeframe(duration, max_candles=MAX_CHART_CANDLES):
+    """Pick the finest timeframe that draws `duration` seconds in at most max_candles"""
+    for timeframe in CHART_TIMEFRAMES:
+        if duration / (timeframe_to_ms(timeframe) // 1000) <= max_candles:
+            return timeframe
+    return CHART_TIMEFRAMES[-1]
+
+def timeframe_to_ms(timeframe):
+    """Convert a ccxt timeframe string such as '5m' or '1h' to milliseconds."""
+    return int(timeframe[:-1]) * TIMEFRAME_UNITS[timeframe[-1]] * 1000
+
+def find_missing_ranges(timestamps, start_ms, end_ms, step_ms):
+    """Return the (start, end) runs of the candle grid absent from timestamps."""
+    present = set(timestamps)
+    ranges = []
+    run_start = None
+    ts = start_ms
+    while ts <= end_ms:
+        if ts in present:
+            if run_start is not None:
+                ranges.append((run_start, ts - step_ms))
+                run_start = None
+        elif run_start is None:
+            run_start = ts
+        ts += step_ms
+    if run_start is not None:
+        ranges.append((run_start, ts - step_ms))
+    return ranges
+
+def split_pages(start_ms, end_ms, step_ms, page_limit):
+    """Split [start_ms, end_ms] into windows of at most page_limit candles."""
+    page_ms = page_limit * step_ms
+    return [
+        (page_start, min(page_start + page_ms - step_ms, end_ms))
+        for page_start in range(start_ms, end_ms + 1, page_ms)
+    ]
+
+class RateLimiter:
+    """Spaces out request starts by at least `interval` seconds across threads."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class PagedOHLCVFetcher:
+    """Fetches long OHLCV windows as concurrent, rate-limited pages."""
+
+    def __init__(self, page_limit=OHLCV_PAGE_LIMIT, max_in_flight=OHLCV_MAX_IN_FLIGHT):
+        self.page_limit = page_limit
+        self.max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight,
+            thread_name_prefix='ohlcv-fetch'
+        )
+        self._limiters = {}
+        self._limiters_lock = threading.Lock()
+
+    def _get_limiter(self, exchange):
+        """One limiter per exchange client, honouring its ccxt rateLimit (ms)."""
+        with self._limiters_lock:
+            limiter = self._limiters.get(id(exchange))
+            if limiter is None:
+                limiter = RateLimiter(getattr(exchange, 'rateLimit', 0) / 1000)
+                self._limiters[id(exchange)] = limiter
+            return limiter
+
+    def _fetch_page(self, exchange, symbol, timeframe, page_start, page_end, step_ms):
+        self._get_limiter(exchange).wait()
+        ohlcv = exchange.fetch_ohlcv(
+            symbol=symbol,
+            timeframe=timeframe,
+            since=page_start,
+            limit=(page_end - page_start) // step_ms + 1
+        )
+        return [candle for candle in ohlcv or [] if page_start <= candle[0] <= page_end]
+
+    def fetch(self, exchange, symbol, timeframe, start_ms, end_ms):
+        """Fetch every candle with start_ms <= ts <= end_ms, merged and deduplicated."""
+        step_ms = timeframe_to_ms(timeframe)
+        pages = split_pages(start_ms, end_ms, step_ms, self.page_limit)
+
+        if len(pages) == 1:
+            results = [self._fetch_page(exchange, symbol, timeframe, *pages[0], step_ms)]
+        else:
+            futures = [
+                self._executor.submit(
+                    self._fetch_page, exchange, symbol, timeframe, page_start, page_end, step_ms
+                )
+                for page_start, page_end in pages
+            ]
+            results = [future.result() for future in futures]
+
+        merged = {}
+        for page in results:
+            for candle in page:
+                merged[candle[0]] = candle
+        return [merged[ts] for ts in sorted(merged)]
+
+class CandleStore:
+    """On-disk OHLCV cache in the bot database.
+
+    Closed candles are stored once and never fetched again; a chart request
+    only goes to the exchange for the parts of its window that are missing.
+    Candles are ccxt-style lists: [timestamp_ms, open, high, low, close, volume].
+    """
+
+    def __init__(self, fetcher=None):
+        self.fetcher = fetcher or PagedOHLCVFetcher()
+        self._lock = threading.Lock()
+        self.candles_from_store = 0
+        self.candles_from_exchange = 0
+
+    def load(self, symbol, timeframe, start_ms, end_ms):
+        """Read stored candles with start_ms <= ts <= end_ms."""
+        conn = DatabaseManager.get_connection()
+        if not conn:
+            return []
+
+        try:
+            cursor = conn.execute(
+                "SELECT ts, open, high, low, close, volume FROM candles "
+                "WHERE symbol = ? AND timeframe = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                (symbol, timeframe, start_ms, end_ms)
+            )
+            return [list(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logging.error(f"Error reading candles: {e}")
+            return []
+
+    def save(self, symbol, timeframe, candles):
+        """Store closed candles, ignoring ones already present."""
+        if not candles:
+            return
+        conn = DatabaseManager.get_connection()
+        if not conn:
+            return
+
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO candles "
+                "(symbol, timeframe, ts, open, high, low, close, volume) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(symbol, timeframe, *candle[:6]) for candle in candles]
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logging.error(f"Error saving candles: {e}")
+
+    def get_candles(self, exchange, symbol, timeframe, start_ms, end_ms):
+        """Return candles for [start_ms, end_ms], fetching only what is missing."""
+        step_ms = timeframe_to_ms(timeframe)
+        # First candle opening at or after start_ms, as the exchange's `since` does
+        first_ts = -(-start_ms // step_ms) * step_ms
+        now_ms = int(time.time() * 1000)
+
+        stored = self.load(symbol, timeframe, first_ts, end_ms)
+        missing = find_missing_ranges(
+            [candle[0] for candle in stored], first_ts, end_ms, step_ms
+        )
+
+        fetched = []
+        for range_start, range_end in missing:
+            fetched.extend(
+                self.fetcher.fetch(exchange, symbol, timeframe, range_start, range_end)
+            )
+
+        # Only closed candles are final; the one still forming is refetched next time
+        self.save(
+            symbol, timeframe,
+            [candle for candle in fetched if candle[0] + step_ms <= now_ms]
+        )
+
+        with self._lock:
+            self.candles_from_store += len(stored)
+            self.candles_from_exchange += len(fetched)
+
+        merged = {candle[0]: candle for candle in stored}
+        merged.update((candle[0], list(candle)) for candle in fetched)
+        return [merged[ts] for ts in sorted(merged)]
+
+    def get_metrics(self):
+        """Return how many candles were served from the store vs the exchange."""
+        with self._lock:
+            total = self.candles_from_store + self.candles_from_exchange
+            return {
+                'from_store': self.candles_from_store,
+                'from_exchange': self.candles_from_exchange,
+                'hit_ratio': self.candles_from_store / total if total else 0.0
+            }
+
+candle_store = CandleStore()
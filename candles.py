@@ -0,0 +1,93 @@
+from datetime import datetime
+import numpy as np
+
+class Candles:
+    """Columnar OHLCV series backed by contiguous NumPy arrays.
+
+    `timestamp` holds int64 epoch milliseconds; the price and volume
+    columns are float64. Built directly from ccxt's list of
+    [timestamp, open, high, low, close, volume] rows.
+    """
+
+    __slots__ = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, timestamp, open, high, low, close, volume):
+        self.timestamp = np.ascontiguousarray(timestamp, dtype=np.int64)
+        self.open = np.ascontiguousarray(open, dtype=np.float64)
+        self.high = np.ascontiguousarray(high, dtype=np.float64)
+        self.low = np.ascontiguousarray(low, dtype=np.float64)
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.volume = np.ascontiguousarray(volume, dtype=np.float64)
+
+    @classmethod
+    def from_ohlcv(cls, rows):
+        """Build from ccxt OHLCV rows; returns None for an empty list."""
+        if not rows:
+            return None
+        table = np.array(rows, dtype=np.float64).T
+        return cls(table[0], table[1], table[2], table[3], table[4], table[5])
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    @property
+    def empty(self):
+        return len(self.timestamp) == 0
+
+    def price_change(self):
+        """Return (start price, end price, change in percent)."""
+        start_price = float(self.open[0])
+        end_price = float(self.close[-1])
+        return start_price, end_price, (end_price - start_price) / start_price * 100
+
+    def high_low(self):
+        """Return (highest high, lowest low) over the series."""
+        return float(self.high.max()), float(self.low.min())
+
+    def midpoint(self):
+        """Index of the middle candle."""
+        return len(self.timestamp) // 2
+
+    def extend(self, newer):
+        """Return this series followed by `newer`; candles `newer` also has are replaced."""
+        if newer is None or newer.empty:
+            return self
+        keep = self.timestamp < newer.timestamp[0]
+        return Candles(*(
+            np.concatenate((getattr(self, name)[keep], getattr(newer, name)))
+            for name in self.__slots__
+        ))
+
+    def slice_time(self, start_ms, end_ms):
+        """Candles opening in [start_ms, end_ms]."""
+        lo = np.searchsorted(self.timestamp, start_ms, side='left')
+        hi = np.searchsorted(self.timestamp, end_ms, side='right')
+        return Candles(*(getattr(self, name)[lo:hi] for name in self.__slots__))
+
+    def resample(self, step_ms):
+        """Aggregate into candles of step_ms, aligned to the epoch like exchange candles.
+
+        Buckets only cover the candles present, so a bucket cut by the
+        start or end of the series is partial.
+        """
+        if self.empty:
+            return self
+        buckets = self.timestamp - self.timestamp % step_ms
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(buckets)] - 1
+        return Candles(
+            buckets[starts],
+            self.open[starts],
+            np.maximum.reduceat(self.high, starts),
+            np.minimum.reduceat(self.low, starts),
+            self.close[ends],
+            np.add.reduceat(self.volume, starts)
+        )
+
+    def datetimes(self):
+        """Timestamps as a datetime64[ms] array (UTC, as plotted)."""
+        return self.timestamp.astype('datetime64[ms]')
+
+    def datetime_at(self, index):
+        """Timestamp of one candle as a naive UTC datetime."""
+        return datetime.utcfromtimestamp(int(self.timestamp[index]) / 1000)
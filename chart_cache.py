@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+from config import SATOSHI_CACHE_SIZE, SATOSHI_CACHE_TTL
+from candle_store import timeframe_to_ms
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with a per-entry time to live."""
+
+    def __init__(self, capacity, ttl):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value, or None if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries past capacity."""
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_metrics(self):
+        """Return hit/miss/eviction counters."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_ratio': self.hits / total if total else 0.0
+            }
+
+def satoshi_chart_key(start_time, end_time, event_type, timeframe):
+    """Key a /satoshi chart by its start event and its end rounded down to a candle."""
+    step = timeframe_to_ms(timeframe) // 1000
+    end_bucket = end_time - end_time % step
+    return (start_time, event_type, end_bucket)
+
+# Rendered /satoshi charts (RenderedChart, PNG plus Telegram file_id)
+satoshi_chart_cache = LRUCache(SATOSHI_CACHE_SIZE, SATOSHI_CACHE_TTL)
@@ -1,81 +1,74 @@
 import requests
 import io
+import math
 import ccxt
 import logging
-import pandas as pd
 import plotly.graph_objects as go
-from plotly.io import to_image
 from datetime import datetime
-from config import CHART_COLORS, SHOW_NEGATIVE_PRICE_CHARTS
+from config import CHART_COLORS, SHOW_NEGATIVE_PRICE_CHARTS, CHART_BACKEND
+
+try:
+    from PIL import Image, ImageColor, ImageDraw, ImageFont
+except ImportError:  # Pillow is only needed for the raster backend
+    Image = None
+from candle_store import candle_store, select_timeframe, timeframe_to_ms, BASE_TIMEFRAME
+from candles import Candles
+from candle_feed import candle_feed
+from chart_renderer import chart_renderer
+
+def to_chart_resolution(candles, duration):
+    """Resample 1m candles to the timeframe select_timeframe picks for `duration` seconds"""
+    timeframe = select_timeframe(duration)
+    if candles is None or timeframe == BASE_TIMEFRAME:
+        return candles
+    return candles.resample(timeframe_to_ms(timeframe))
 
 class BitcoinChartGenerator:
     def __init__(self):
         self.exchange = ccxt.binance()
         self.colors = CHART_COLORS
+        self.candle_store = candle_store
+
+    def fetch_base_candles(self, start_ms, end_ms):
+        """1m candles opening in [start_ms, end_ms] as Candles, or None"""
+        # Recent windows come from the live ring buffer with no network I/O
+        candles = candle_feed.window(start_ms, end_ms)
+        if candles is not None:
+            return candles
+        # Cached candles come from disk; only missing ranges hit the exchange
+        ohlcv = self.candle_store.get_candles(
+            self.exchange, 'BTC/USDT', BASE_TIMEFRAME, start_ms, end_ms
+        )
+        return Candles.from_ohlcv(ohlcv)
 
     def fetch_ohlcv_data(self, start_timestamp, end_timestamp):
-        """Fetch OHLCV data from exchange"""
+        """Fetch 1m candles and resample them to the chart's timeframe"""
         try:
-            duration = end_timestamp - start_timestamp
-            duration_hours = duration / 3600
-            
-            # Determine appropriate timeframe
-            if duration_hours <= 4:
-                timeframe = '1m'
-            elif duration_hours <= 24:
-                timeframe = '5m'
-            elif duration_hours <= 72:
-                timeframe = '15m'
-            else:
-                timeframe = '1h'
-            
-            ohlcv = self.exchange.fetch_ohlcv(
-                symbol='BTC/USDT',
-                timeframe=timeframe,
-                since=int(start_timestamp * 1000),
-                limit=500
-            )
-            
-            if not ohlcv:
-                return None
-                
-            df = pd.DataFrame(
-                ohlcv,
-                columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']
-            )
-            
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            return df
-            
+            candles = self.fetch_base_candles(int(start_timestamp * 1000), int(end_timestamp * 1000))
+            return to_chart_resolution(candles, end_timestamp - start_timestamp)
         except Exception as e:
             logging.error(f"Error fetching data: {e}")
             return None
 
-    def create_chart(self, start_time, end_time, duration_str, event_type, show_chart=False):
-        """Create the Bitcoin chart"""
+    def create_chart(self, start_time, end_time, duration_str, event_type, show_chart=False, candles=None):
+        """Create the Bitcoin chart, fetching the data unless it is supplied"""
         try:
-            df = self.fetch_ohlcv_data(start_time, end_time)
-            if df is None or df.empty:
+            if candles is None:
+                candles = self.fetch_ohlcv_data(start_time, end_time)
+            if candles is None or candles.empty:
                 logging.error("No data available for chart")
                 return None
             
-            # Calculate price change
-            start_price = df['open'].iloc[0]
-            end_price = df['close'].iloc[-1]
-            price_change = ((end_price - start_price) / start_price) * 100
-            
-            # Check if we should skip negative price changes
-            if not SHOW_NEGATIVE_PRICE_CHARTS and price_change < 0:
-                logging.info(f"Skipping chart due to negative price change: {price_change:.2f}%")
+            prices = self._get_price_change(candles)
+            if prices is None:
                 return None
-                
-            price_change_color = self.colors['up'] if price_change >= 0 else self.colors['down']
+            start_price, end_price, price_change, price_change_color = prices
 
             # Create the chart figure
-            fig = self._create_candlestick_chart(df, price_change, price_change_color)
+            fig = self._create_candlestick_chart(candles, price_change, price_change_color)
             
             # Add additional annotations
-            self._add_price_annotations(fig, df, start_price, end_price)
+            self._add_price_annotations(fig, candles, start_price, end_price)
             self._add_watermark(fig)
             self._add_title(fig, event_type)
 
@@ -85,15 +78,34 @@ class BitcoinChartGenerator:
             logging.error(f"Error creating chart: {e}")
             return None
 
-    def _create_candlestick_chart(self, df, price_change, price_change_color):
+    def _get_price_change(self, candles):
+        """Return (start, end, change %, color), or None if the chart is skipped"""
+        start_price, end_price, price_change = candles.price_change()
+
+        # Check if we should skip negative price changes
+        if not SHOW_NEGATIVE_PRICE_CHARTS and price_change < 0:
+            logging.info(f"Skipping chart due to negative price change: {price_change:.2f}%")
+            return None
+
+        price_change_color = self.colors['up'] if price_change >= 0 else self.colors['down']
+        return start_price, end_price, price_change, price_change_color
+
+    def create_raster_chart(self, candles, event_type):
+        """Draw the chart straight to PNG bytes; None if the chart is skipped"""
+        prices = self._get_price_change(candles)
+        if prices is None:
+            return None
+        return RasterChartRenderer(self.colors).render(candles, *prices, event_type)
+
+    def _create_candlestick_chart(self, candles, price_change, price_change_color):
         """Create base candlestick chart"""
         fig = go.Figure(data=[
             go.Candlestick(
-                x=df['timestamp'],
-                open=df['open'],
-                high=df['high'],
-                low=df['low'],
-                close=df['close'],
+                x=candles.datetimes(),
+                open=candles.open,
+                high=candles.high,
+                low=candles.low,
+                close=candles.close,
                 increasing_line_color=self.colors['up'],
                 decreasing_line_color=self.colors['down'],
                 increasing_fillcolor=self.colors['up'],
@@ -105,8 +117,8 @@ class BitcoinChartGenerator:
 
         # Add price change annotation
         fig.add_annotation(
-            x=df['timestamp'].iloc[len(df)//2],
-            y=df['high'].max(),
+            x=candles.datetime_at(candles.midpoint()),
+            y=candles.high_low()[0],
             text=f"{price_change:+.2f}%",
             font=dict(size=36, color=price_change_color),
             showarrow=False,
@@ -146,10 +158,10 @@ class BitcoinChartGenerator:
 
         return fig
 
-    def _add_price_annotations(self, fig, df, start_price, end_price):
+    def _add_price_annotations(self, fig, candles, start_price, end_price):
         """Add price labels to chart"""
         fig.add_annotation(
-            x=df['timestamp'].iloc[0],
+            x=candles.datetime_at(0),
             y=start_price,
             text=f"${start_price:,.2f}",
             font=dict(size=12, color=self.colors['text']),
@@ -160,7 +172,7 @@ class BitcoinChartGenerator:
         )
 
         fig.add_annotation(
-            x=df['timestamp'].iloc[-1],
+            x=candles.datetime_at(-1),
             y=end_price,
             text=f"${end_price:,.2f}",
             font=dict(size=12, color=self.colors['text']),
@@ -212,16 +224,205 @@ class BitcoinChartGenerator:
             xanchor='center',
         )
 
-    def create_chart_for_period(self, start_time, end_time, duration_str, event_type):
+    def create_chart_for_period(self, start_time, end_time, duration_str, event_type, candles=None):
         """Generate and send Bitcoin chart for a specific period"""
         try:
-            fig = self.create_chart(start_time, end_time, duration_str, event_type, show_chart=False)
+            if candles is None:
+                candles = self.fetch_ohlcv_data(start_time, end_time)
+            if candles is None or candles.empty:
+                logging.error("No data available for chart")
+                return None
+
+            if CHART_BACKEND == 'raster' and Image is not None:
+                try:
+                    img_bytes = self.create_raster_chart(candles, event_type)
+                    return io.BytesIO(img_bytes) if img_bytes else None
+                except Exception as e:
+                    logging.error(f"Raster chart failed, falling back to Plotly: {e}")
+
+            fig = self.create_chart(start_time, end_time, duration_str, event_type, show_chart=False, candles=candles)
             if fig is None:
                 return None
 
-            # Convert the figure to PNG bytes
-            img_bytes = to_image(fig, format="png")
+            # Convert the figure to PNG bytes on the warm renderer pool
+            img_bytes = chart_renderer.render(fig, fmt="png")
             return io.BytesIO(img_bytes)
         except Exception as e:
             logging.error(f"Error generating Bitcoin chart: {e}")
             return None
+
+
+class RasterChartRenderer:
+    """Draws the candlestick layout of BitcoinChartGenerator with Pillow.
+
+    Mirrors _create_candlestick_chart, _add_price_annotations, _add_watermark
+    and _add_title without starting a browser engine.
+    """
+
+    WIDTH = 700
+    HEIGHT = 600
+    # Wider side margins than Plotly's: no automargin here to make room for labels
+    MARGIN = dict(t=50, l=80, r=70, b=90)
+    FONT_FILES = ['DejaVuSans.ttf', 'Helvetica.ttc', 'Arial.ttf']
+
+    def __init__(self, colors):
+        self.colors = colors
+        self._fonts = {}
+
+    def _font(self, size):
+        if size not in self._fonts:
+            font = None
+            for name in self.FONT_FILES:
+                try:
+                    font = ImageFont.truetype(name, size)
+                    break
+                except OSError:
+                    continue
+            self._fonts[size] = font or ImageFont.load_default()
+        return self._fonts[size]
+
+    @staticmethod
+    def _rgba(color, alpha=1.0):
+        return ImageColor.getrgb(color)[:3] + (int(255 * alpha),)
+
+    @staticmethod
+    def _nice_step(span, ticks=5):
+        """Round a tick step to 1, 2, 2.5 or 5 times a power of ten."""
+        raw = span / ticks
+        magnitude = 10 ** math.floor(math.log10(raw))
+        for factor in (1, 2, 2.5, 5, 10):
+            if raw <= factor * magnitude:
+                return factor * magnitude
+        return 10 * magnitude
+
+    def _draw_text_box(self, draw, xy, text, font, color, anchor='mm',
+                       bgcolor=None, bordercolor=None, borderwidth=0, borderpad=0):
+        """Draw (multiline) text with an optional padded, bordered background."""
+        bbox = draw.multiline_textbbox(xy, text, font=font, anchor=anchor, align='center')
+        if bgcolor or bordercolor:
+            box = (
+                bbox[0] - borderpad, bbox[1] - borderpad,
+                bbox[2] + borderpad, bbox[3] + borderpad
+            )
+            draw.rectangle(box, fill=bgcolor, outline=bordercolor, width=borderwidth)
+        draw.multiline_text(xy, text, font=font, fill=color, anchor=anchor, align='center')
+
+    def render(self, candles, start_price, end_price, price_change, price_change_color, event_type):
+        """Render the chart and return PNG bytes."""
+        image = Image.new('RGBA', (self.WIDTH, self.HEIGHT), self._rgba(self.colors['background']))
+        draw = ImageDraw.Draw(image, 'RGBA')
+
+        left = self.MARGIN['l']
+        right = self.WIDTH - self.MARGIN['r']
+        top = self.MARGIN['t']
+        bottom = self.HEIGHT - self.MARGIN['b']
+
+        opens = candles.open.tolist()
+        highs = candles.high.tolist()
+        lows = candles.low.tolist()
+        closes = candles.close.tolist()
+
+        price_max, price_min = candles.high_low()
+        highest = price_max
+        padding = (price_max - price_min) * 0.05 or price_max * 0.001
+        price_min -= padding
+        price_max += padding
+
+        def y_of(price):
+            return bottom - (price - price_min) / (price_max - price_min) * (bottom - top)
+
+        slot = (right - left) / len(opens)
+
+        def x_of(index):
+            return left + (index + 0.5) * slot
+
+        self._draw_axes(image, draw, candles, price_min, price_max, y_of, x_of, left, top, bottom)
+        self._draw_candlesticks(draw, opens, highs, lows, closes, y_of, x_of, slot)
+
+        # Price change annotation, centred on the highest high like the Plotly version
+        self._draw_text_box(
+            draw, (x_of(candles.midpoint()), y_of(highest)),
+            f"{price_change:+.2f}%", self._font(36),
+            self._rgba(price_change_color, 0.9),
+            bgcolor=(0, 0, 0, 115),
+            bordercolor=self._rgba(price_change_color, 0.9),
+            borderwidth=2, borderpad=10
+        )
+        self._draw_price_annotations(draw, x_of(0), x_of(len(opens) - 1), y_of, start_price, end_price)
+        image = self._draw_watermark(image)
+        self._draw_title(ImageDraw.Draw(image, 'RGBA'), event_type)
+
+        output = io.BytesIO()
+        image.convert('RGB').save(output, format='PNG', optimize=False)
+        return output.getvalue()
+
+    def _draw_axes(self, image, draw, candles, price_min, price_max, y_of, x_of, left, top, bottom):
+        """Y price ticks on the left, date ticks along the bottom"""
+        text_color = self._rgba(self.colors['text'])
+        tick_font = self._font(12)
+
+        step = self._nice_step(price_max - price_min)
+        tick = math.ceil(price_min / step) * step
+        while tick <= price_max:
+            draw.text((left - 6, y_of(tick)), f"${tick:,.0f}", font=tick_font, fill=text_color, anchor='rm')
+            tick += step
+
+        # Rotated axis title
+        title = Image.new('RGBA', (120, 16), (0, 0, 0, 0))
+        ImageDraw.Draw(title).text((60, 8), "Price (USDT)", font=tick_font, fill=text_color, anchor='mm')
+        title = title.rotate(90, expand=True)
+        image.paste(title, (2, int((top + bottom) / 2 - 60)), title)
+
+        span = (int(candles.timestamp[-1]) - int(candles.timestamp[0])) / 1000
+        time_format = '%H:%M' if span <= 2 * 24 * 3600 else '%b %d'
+        count = min(6, len(candles))
+        for i in range(count):
+            index = round(i * (len(candles) - 1) / max(count - 1, 1))
+            draw.text(
+                (x_of(index), bottom + 8), candles.datetime_at(index).strftime(time_format),
+                font=tick_font, fill=text_color, anchor='mt'
+            )
+
+    def _draw_candlesticks(self, draw, opens, highs, lows, closes, y_of, x_of, slot):
+        """Wicks and bodies coloured like the Plotly candlestick trace"""
+        body_half = max(slot * 0.35, 0.5)
+        for index, (open_, high, low, close) in enumerate(zip(opens, highs, lows, closes)):
+            color = self._rgba(self.colors['up'] if close >= open_ else self.colors['down'])
+            x = x_of(index)
+            draw.line((x, y_of(high), x, y_of(low)), fill=color, width=1)
+            body_top, body_bottom = sorted((y_of(open_), y_of(close)))
+            draw.rectangle(
+                (x - body_half, body_top, x + body_half, max(body_bottom, body_top + 1)),
+                fill=color
+            )
+
+    def _draw_price_annotations(self, draw, start_x, end_x, y_of, start_price, end_price):
+        """Start and end price labels beside the first and last candles"""
+        font = self._font(12)
+        color = self._rgba(self.colors['text'])
+        draw.text((start_x - 10, y_of(start_price)), f"${start_price:,.2f}", font=font, fill=color, anchor='rm')
+        draw.text((end_x + 10, y_of(end_price)), f"${end_price:,.2f}", font=font, fill=color, anchor='lm')
+
+    def _draw_watermark(self, image):
+        """Rotated #PepitoIsSatoshi watermark across the middle"""
+        font = self._font(50)
+        text = "#PepitoIsSatoshi"
+        bbox = font.getbbox(text)
+        layer = Image.new('RGBA', (bbox[2] - bbox[0] + 4, bbox[3] - bbox[1] + 4), (0, 0, 0, 0))
+        ImageDraw.Draw(layer).text((2 - bbox[0], 2 - bbox[1]), text, font=font, fill=(0, 100, 100, 32))
+        layer = layer.rotate(30, expand=True, resample=Image.BICUBIC)
+
+        overlay = Image.new('RGBA', image.size, (0, 0, 0, 0))
+        overlay.paste(layer, ((image.width - layer.width) // 2, (image.height - layer.height) // 2))
+        return Image.alpha_composite(image, overlay)
+
+    def _draw_title(self, draw, event_type):
+        """Boxed title in the bottom margin"""
+        self._draw_text_box(
+            draw, (self.WIDTH / 2, self.HEIGHT - 38),
+            f"Bitcoin Price During\nPépito's {'Indoor' if event_type == 'in' else 'Outdoor'} Adventure",
+            self._font(20), self._rgba(self.colors['up'], 0.9),
+            bgcolor=(0, 0, 0, 115),
+            bordercolor=self._rgba(self.colors['up'], 0.9),
+            borderwidth=2, borderpad=10
+        )
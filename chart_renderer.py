@@ -0,0 +1,176 @@
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeoutError
+from config import (
+    RENDER_POOL_SIZE, RENDER_QUEUE_SIZE, RENDER_TIMEOUT,
+    RENDER_MAX_JOBS_PER_WORKER
+)
+
+LATENCY_WINDOW = 1000
+METRICS_LOG_EVERY = 50
+
+def _warm_worker():
+    """Pool initializer: start Kaleido once so real jobs skip the cold start."""
+    import plotly.graph_objects as go
+    from plotly.io import to_image
+    try:
+        to_image(go.Figure(), format='png', width=10, height=10)
+    except Exception as e:
+        logging.error(f"Render worker warm-up failed: {e}")
+
+def _render_figure(fig_json, fmt):
+    """Worker job: rebuild the figure from JSON and rasterize it."""
+    import plotly.io as pio
+    return pio.to_image(pio.from_json(fig_json), format=fmt)
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def _settle(future, method, value):
+    """Complete a future unless a pool recycle already failed it."""
+    try:
+        method(value)
+    except InvalidStateError:
+        pass
+
+class ChartRenderer:
+    """Pool of pre-warmed Kaleido render processes.
+
+    Workers are started at boot and warmed with a tiny render, recycled
+    after RENDER_MAX_JOBS_PER_WORKER jobs to bound their memory, and fed
+    through a bounded queue so bursts cannot pile up unbounded work.
+    """
+
+    def __init__(self, pool_size=RENDER_POOL_SIZE, queue_size=RENDER_QUEUE_SIZE,
+                 timeout=RENDER_TIMEOUT, max_jobs_per_worker=RENDER_MAX_JOBS_PER_WORKER):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._pool = None
+        # Futures of jobs queued on the current pool, failed when it is replaced
+        self._in_flight = set()
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size + queue_size)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._metrics_lock = threading.Lock()
+        self.renders = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def start(self):
+        """Start and warm the worker pool (no-op when the pool size is 0)."""
+        with self._pool_lock:
+            if self._pool is not None or self.pool_size <= 0:
+                return
+            # spawn: forking a process that already runs threads is unsafe
+            context = multiprocessing.get_context('spawn')
+            self._pool = context.Pool(
+                processes=self.pool_size,
+                initializer=_warm_worker,
+                maxtasksperchild=self.max_jobs_per_worker
+            )
+        logging.info(f"Chart renderer pool started with {self.pool_size} workers")
+
+    def stop(self):
+        """Terminate the worker pool, failing any jobs still queued on it."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+            jobs, self._in_flight = self._in_flight, set()
+        self._terminate(pool, jobs)
+
+    def _terminate(self, pool, jobs):
+        for future in jobs:
+            _settle(future, future.set_exception, RuntimeError("Chart render pool was recycled"))
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    def _restart(self, pool):
+        """Replace `pool` after a worker got stuck on one of its jobs.
+
+        Only the first timeout on a pool recycles it; jobs that were queued
+        on it fail at once instead of each waiting out its own timeout.
+        """
+        with self._pool_lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            jobs, self._in_flight = self._in_flight, set()
+        self._terminate(pool, jobs)
+        self.start()
+
+    def render(self, fig, fmt='png'):
+        """Render a Plotly figure to image bytes through the pool."""
+        with self._pool_lock:
+            pool, jobs = self._pool, self._in_flight
+        if pool is None:
+            # Pool disabled or not started: render in-process
+            from plotly.io import to_image
+            return self._timed_render(lambda: to_image(fig, format=fmt))
+
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._metrics_lock:
+                self.rejected += 1
+            raise RuntimeError("Chart render queue is full")
+
+        job = Future()
+        try:
+            with self._pool_lock:
+                jobs.add(job)
+            pool.apply_async(
+                _render_figure, (fig.to_json(), fmt),
+                callback=lambda result: _settle(job, job.set_result, result),
+                error_callback=lambda error: _settle(job, job.set_exception, error)
+            )
+            return self._timed_render(lambda: job.result(timeout=self.timeout))
+        except FutureTimeoutError:
+            # Not the builtin TimeoutError before Python 3.11
+            logging.error(f"Chart render timed out after {self.timeout}s, recycling pool")
+            self._restart(pool)
+            raise
+        finally:
+            with self._pool_lock:
+                jobs.discard(job)
+            self._slots.release()
+
+    def _timed_render(self, render):
+        started = time.perf_counter()
+        try:
+            result = render()
+        except Exception:
+            with self._metrics_lock:
+                self.failures += 1
+            raise
+
+        with self._metrics_lock:
+            self._latencies.append(time.perf_counter() - started)
+            self.renders += 1
+            log_metrics = self.renders % METRICS_LOG_EVERY == 0
+        if log_metrics:
+            logging.info(f"Chart renderer metrics: {self.get_metrics()}")
+        return result
+
+    def get_metrics(self):
+        """Return render counts and latency percentiles (seconds) over recent jobs."""
+        with self._metrics_lock:
+            latencies = sorted(self._latencies)
+            metrics = {
+                'renders': self.renders,
+                'failures': self.failures,
+                'rejected': self.rejected
+            }
+        metrics.update({
+            'p50': percentile(latencies, 0.50),
+            'p90': percentile(latencies, 0.90),
+            'p99': percentile(latencies, 0.99)
+        })
+        return metrics
+
+chart_renderer = ChartRenderer()
@@ -1,11 +1,13 @@
 import requests
 import logging
 from datetime import datetime, timezone
-from database import DatabaseManager
-from utils import get_random_image, get_random_gif, format_duration, get_status_text
+from state import pepito_state
+from utils import format_duration, get_status_text
+from media_catalog import media_catalog
 from bot_handlers import (
     is_authorized, is_admin, is_group_chat, is_group_admin,
-    send_telegram_photo_with_caption, send_btc_chart, get_menu_keyboard
+    send_telegram_photo_with_caption, send_satoshi_chart, get_menu_keyboard,
+    send_media_file
 )
 
 def register_handlers(bot):
@@ -96,8 +98,8 @@ def register_handlers(bot):
             return
         
         try:
-            last_in = DatabaseManager.get_last_event("in")
-            last_out = DatabaseManager.get_last_event("out")
+            last_in = pepito_state.get_last_event("in")
+            last_out = pepito_state.get_last_event("out")
             
             if not last_in and not last_out:
                 bot.reply_to(message, "No recorded activity for Pépito yet.")
@@ -126,7 +128,7 @@ def register_handlers(bot):
             return
             
         try:
-            stats = DatabaseManager.get_location_stats()
+            stats = pepito_state.get_location_stats()
             stats_text = get_status_text(
                 stats.get('current_location'),
                 stats.get('current_duration'),
@@ -139,7 +141,7 @@ def register_handlers(bot):
                 f"{stats_text}"
             )
             
-            last_event = DatabaseManager.get_last_event(stats.get('current_location'))
+            last_event = pepito_state.get_last_event(stats.get('current_location'))
             if last_event:
                 send_telegram_photo_with_caption(bot, message.chat.id, last_event[3], caption)
             else:
@@ -157,7 +159,7 @@ def register_handlers(bot):
             return
 
         try:
-            last_event = DatabaseManager.get_last_event(None)  # Get most recent event
+            last_event = pepito_state.get_last_event()  # Get most recent event
             if not last_event:
                 bot.reply_to(message, "No recorded activity for Pépito yet.")
                 return
@@ -172,8 +174,9 @@ def register_handlers(bot):
             )
             
             try:
-                send_btc_chart(bot, message.chat.id, last_event[2], current_time, 
-                             duration_str, last_event[1])
+                if not send_satoshi_chart(bot, message.chat.id, last_event[2], current_time,
+                                          duration_str, last_event[1]):
+                    bot.reply_to(message, "Failed to generate chart.")
             except Exception as e:
                 bot.reply_to(message, "Failed to generate chart.")
             finally:
@@ -192,13 +195,13 @@ def register_handlers(bot):
         if not is_authorized(message):
             return
             
-        image_path = get_random_image()
-        if not image_path:
+        item = media_catalog.random_item()
+        if not item:
             bot.reply_to(message, "😿 No images available.")
             return
             
         try:
-            stats = DatabaseManager.get_location_stats()
+            stats = pepito_state.get_location_stats()
             current_location = stats.get('current_location', 'unknown')
             time_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')
             
@@ -209,21 +212,7 @@ def register_handlers(bot):
                 f"Time: {time_str}\n\n"
             )
             
-            with open(image_path, 'rb') as photo:
-                if image_path.lower().endswith('.gif'):
-                    bot.send_animation(
-                        message.chat.id,
-                        photo,
-                        caption=caption,
-                        parse_mode='HTML'
-                    )
-                else:
-                    bot.send_photo(
-                        message.chat.id,
-                        photo,
-                        caption=caption,
-                        parse_mode='HTML'
-                    )
+            send_media_file(bot, message.chat.id, item, caption)
         except Exception as e:
             logging.error(f"Error in meme command: {e}")
             bot.reply_to(message, "Failed to send meme.")
@@ -233,19 +222,13 @@ def register_handlers(bot):
         if not is_admin(message.from_user.id):
             return
             
-        image_path = get_random_gif()
-        if not image_path:
+        item = media_catalog.random_item(gif_only=True)
+        if not item:
             bot.reply_to(message, "😿 No GIFs available.")
             return
             
         try:
-            with open(image_path, 'rb') as gif:
-                bot.send_animation(
-                    message.chat.id,
-                    gif,
-                    caption="🐱 Pépito GIF!",
-                    parse_mode='HTML'
-                )
+            send_media_file(bot, message.chat.id, item, "🐱 Pépito GIF!")
         except Exception as e:
             logging.error(f"Error in gif command: {e}")
             bot.reply_to(message, "Failed to send GIF.")
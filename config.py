@@ -16,18 +16,91 @@ SSE_URL = os.getenv('SSE_URL', 'https://api.thecatdoor.com/sse/v1/events')
 # File Paths
 DB_FILE = os.getenv('DB_FILE', 'pepito_bot.db')
 IMAGES_DIR = os.getenv('IMAGES_DIR', 'images')
+MEDIA_RESCAN_INTERVAL = float(os.getenv('MEDIA_RESCAN_INTERVAL', '5'))
+
+# Media Optimization Settings (GIF -> MP4 needs ffmpeg, photos need Pillow)
+MEDIA_OPTIMIZE = os.getenv('MEDIA_OPTIMIZE', 'True').lower() == 'true'
+MEDIA_CACHE_DIR = os.getenv('MEDIA_CACHE_DIR', 'media_cache')
+MEDIA_MAX_PHOTO_SIDE = int(os.getenv('MEDIA_MAX_PHOTO_SIDE', '1280'))
+MEDIA_JPEG_QUALITY = int(os.getenv('MEDIA_JPEG_QUALITY', '85'))
+MEDIA_VIDEO_CRF = int(os.getenv('MEDIA_VIDEO_CRF', '28'))
+
+# Database Settings
+DB_BUSY_TIMEOUT = float(os.getenv('DB_BUSY_TIMEOUT', '5'))
+DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', '8192'))
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', str(64 * 1024 * 1024)))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '128'))
 
 # Feature Flags
 SHOW_NEGATIVE_PRICE_CHARTS = os.getenv('SHOW_NEGATIVE_PRICE_CHARTS', 'True').lower() == 'true'
 SHOW_BTC_CHARTS = os.getenv('SHOW_BTC_CHARTS', 'True').lower() == 'true'
 
+# Chart backend: 'plotly' (Kaleido) or 'raster' (Pillow, falls back to Plotly)
+CHART_BACKEND = os.getenv('CHART_BACKEND', 'plotly').lower()
+
 # Connection Settings
 MAX_RETRIES = int(os.getenv('MAX_RETRIES', '5'))
 BACKOFF_FACTOR = float(os.getenv('BACKOFF_FACTOR', '0.2'))
 RETRY_STATUSES = [500, 502, 503, 504]
 STREAM_TIMEOUT = int(os.getenv('STREAM_TIMEOUT', '30'))
+SSE_BACKOFF_MAX = float(os.getenv('SSE_BACKOFF_MAX', '60'))
 POLLING_TIMEOUT = int(os.getenv('POLLING_TIMEOUT', '20'))
 
+# Event Pipeline Settings
+EVENT_PIPELINE_WORKERS = int(os.getenv('EVENT_PIPELINE_WORKERS', '4'))
+
+# Event Writer Settings (group commit). MAX_LATENCY is how long a batch may
+# wait for more rows; 0 commits whatever queued up during the previous commit.
+EVENT_WRITE_BATCH_SIZE = int(os.getenv('EVENT_WRITE_BATCH_SIZE', '100'))
+EVENT_WRITE_MAX_LATENCY = float(os.getenv('EVENT_WRITE_MAX_LATENCY', '0'))
+# Seconds store_event waits for its commit before the event is retried
+EVENT_WRITE_TIMEOUT = float(os.getenv('EVENT_WRITE_TIMEOUT', '30'))
+
+# Runtime mode: 'threads' (TeleBot + worker threads) or 'asyncio' (AsyncTeleBot)
+RUNTIME_MODE = os.getenv('RUNTIME_MODE', 'threads').lower()
+ASYNC_MAX_CONCURRENT_SENDS = int(os.getenv('ASYNC_MAX_CONCURRENT_SENDS', '25'))
+
+# Event Outbox Settings
+OUTBOX_MAX_DEPTH = int(os.getenv('OUTBOX_MAX_DEPTH', '1000'))
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '10'))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '3'))
+OUTBOX_CLAIM_TIMEOUT = int(os.getenv('OUTBOX_CLAIM_TIMEOUT', '600'))
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', '1'))
+# Seconds before a released event is retried, doubled on each further attempt
+OUTBOX_RETRY_BACKOFF = int(os.getenv('OUTBOX_RETRY_BACKOFF', '30'))
+
+# Market Data Settings
+OHLCV_PAGE_LIMIT = int(os.getenv('OHLCV_PAGE_LIMIT', '500'))
+OHLCV_MAX_IN_FLIGHT = int(os.getenv('OHLCV_MAX_IN_FLIGHT', '4'))
+# Only 1m candles are fetched; charts are resampled to at most this many candles
+MAX_CHART_CANDLES = int(os.getenv('MAX_CHART_CANDLES', '300'))
+
+# Live 1m candle ring buffer, polled in the background so charts skip the exchange
+CANDLE_FEED_ENABLED = os.getenv('CANDLE_FEED_ENABLED', 'True').lower() == 'true'
+CANDLE_BUFFER_MINUTES = int(os.getenv('CANDLE_BUFFER_MINUTES', str(7 * 24 * 60)))
+CANDLE_FEED_INTERVAL = float(os.getenv('CANDLE_FEED_INTERVAL', '20'))
+CANDLE_FEED_MAX_LAG = int(os.getenv('CANDLE_FEED_MAX_LAG', '2'))
+
+# How often the adventure in progress pulls its newest candles
+ADVENTURE_UPDATE_INTERVAL = float(os.getenv('ADVENTURE_UPDATE_INTERVAL', '60'))
+
+# Charting stack (plotly/ccxt) is imported lazily; pre-warm it this
+# many seconds after startup (negative disables pre-warming)
+CHART_PREWARM_DELAY = float(os.getenv('CHART_PREWARM_DELAY', '5'))
+
+# Log cache, store and worker metrics this often in seconds (0 disables)
+METRICS_LOG_INTERVAL = float(os.getenv('METRICS_LOG_INTERVAL', '900'))
+
+# Chart Renderer Settings
+RENDER_POOL_SIZE = int(os.getenv('RENDER_POOL_SIZE', '2'))
+RENDER_QUEUE_SIZE = int(os.getenv('RENDER_QUEUE_SIZE', '8'))
+RENDER_TIMEOUT = float(os.getenv('RENDER_TIMEOUT', '30'))
+RENDER_MAX_JOBS_PER_WORKER = int(os.getenv('RENDER_MAX_JOBS_PER_WORKER', '100'))
+
+# Chart Cache Settings
+SATOSHI_CACHE_SIZE = int(os.getenv('SATOSHI_CACHE_SIZE', '32'))
+SATOSHI_CACHE_TTL = int(os.getenv('SATOSHI_CACHE_TTL', '300'))
+
 # Chart Colors
 CHART_COLORS = {
     'background': '#131722',
@@ -1,20 +1,266 @@
 import requests
 import sqlite3
 import logging
+import threading
 from datetime import datetime
-from config import DB_FILE
+from itertools import zip_longest
+from config import (
+    DB_FILE, DB_BUSY_TIMEOUT, DB_CACHE_SIZE_KB,
+    DB_MMAP_SIZE, DB_STATEMENT_CACHE_SIZE
+)
+
+# Each thread (SSE processor, telebot workers) keeps its own long-lived
+# connection; sqlite3 connections must not be shared across threads.
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+
+# Schema migrations, applied in order at startup. PRAGMA user_version
+# records how many have run, so each one is applied exactly once.
+MIGRATIONS = [
+    # 1: time-ordered indexes for the last-event and opposite-event lookups
+    [
+        "CREATE INDEX IF NOT EXISTS idx_events_type_time ON events (type, time)",
+        "CREATE INDEX IF NOT EXISTS idx_events_time ON events (time, type)",
+    ],
+    # 2: Telegram file_id for each uploaded media source (URL or local path)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS telegram_files (
+            source TEXT PRIMARY KEY,
+            file_id TEXT NOT NULL,
+            updated INTEGER NOT NULL
+        )
+        """,
+    ],
+    # 3: local OHLCV candle store, keyed by symbol and timeframe
+    [
+        """
+        CREATE TABLE IF NOT EXISTS candles (
+            symbol TEXT NOT NULL,
+            timeframe TEXT NOT NULL,
+            ts INTEGER NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            volume REAL NOT NULL,
+            PRIMARY KEY (symbol, timeframe, ts)
+        ) WITHOUT ROWID
+        """,
+    ],
+    # 4: one row per (type, time) so replayed SSE events are ignored
+    [
+        "DELETE FROM events WHERE id NOT IN (SELECT MIN(id) FROM events GROUP BY type, time)",
+        "DROP INDEX IF EXISTS idx_events_type_time",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_events_type_time ON events (type, time)",
+    ],
+    # 5: durable event outbox with per-chat delivery state
+    [
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            time INTEGER NOT NULL,
+            img TEXT,
+            state TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            claimed_at INTEGER,
+            created INTEGER NOT NULL,
+            UNIQUE (type, time)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_outbox_state ON outbox (state, id)",
+        """
+        CREATE TABLE IF NOT EXISTS outbox_deliveries (
+            outbox_id INTEGER NOT NULL REFERENCES outbox (id) ON DELETE CASCADE,
+            chat_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            updated INTEGER,
+            PRIMARY KEY (outbox_id, kind, chat_id)
+        ) WITHOUT ROWID
+        """,
+    ],
+    # 6: materialized sessions, one per run of same-type events; filled by init_db
+    [
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY,
+            location TEXT NOT NULL,
+            start_time INTEGER NOT NULL,
+            end_time INTEGER,
+            duration INTEGER,
+            last_time INTEGER NOT NULL,
+            last_event_id INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions (start_time)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_location_start ON sessions (location, start_time)",
+    ],
+    # 7: earliest retry time of a released outbox event
+    [
+        "ALTER TABLE outbox ADD COLUMN not_before INTEGER NOT NULL DEFAULT 0",
+    ],
+]
+
+# Hot queries, shared with check_query_plans()
+LAST_EVENT_BY_TYPE_SQL = "SELECT * FROM events WHERE type = ? ORDER BY time DESC LIMIT 1"
+LAST_EVENT_SQL = "SELECT type, time FROM events ORDER BY time DESC LIMIT 1"
+PREVIOUS_EVENT_BY_TYPE_SQL = (
+    "SELECT time FROM events WHERE type = ? AND time < ? ORDER BY time DESC LIMIT 1"
+)
+LATEST_SESSIONS_SQL = (
+    "SELECT id, location, start_time, last_time FROM sessions "
+    "ORDER BY start_time DESC, id DESC LIMIT ?"
+)
+PREVIOUS_SESSION_EVENT_SQL = (
+    "SELECT e.id, e.type, e.time, e.img FROM sessions s JOIN events e ON e.id = s.last_event_id "
+    "WHERE s.location = ? AND s.start_time < ? ORDER BY s.start_time DESC, s.id DESC LIMIT 1"
+)
+HOT_QUERIES = [
+    (LAST_EVENT_BY_TYPE_SQL, ('in',)),
+    (LAST_EVENT_SQL, ()),
+    (PREVIOUS_EVENT_BY_TYPE_SQL, ('out', 0)),
+    (LATEST_SESSIONS_SQL, (2,)),
+    (PREVIOUS_SESSION_EVENT_SQL, ('out', 0)),
+]
+
+def build_sessions(events):
+    """Group (id, type, time) rows, in time order, into session rows.
+
+    Yields (location, start_time, end_time, duration, last_time,
+    last_event_id); the final, still open session has no end.
+    """
+    current = None
+    for event_id, event_type, event_time in events:
+        if current is not None and current[0] == event_type:
+            current[4] = event_time
+            current[5] = event_id
+            continue
+        if current is not None:
+            current[2] = event_time
+            current[3] = event_time - current[1]
+            yield tuple(current)
+        current = [event_type, event_time, None, None, event_time, event_id]
+    if current is not None:
+        yield tuple(current)
 
 class DatabaseManager:
+    @staticmethod
+    def _open_connection():
+        """Open a new tuned connection to the database."""
+        conn = sqlite3.connect(
+            DB_FILE,
+            timeout=DB_BUSY_TIMEOUT,
+            cached_statements=DB_STATEMENT_CACHE_SIZE,
+            # Only the owning thread queries it; this lets shutdown close it
+            check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL fsyncs at checkpoints, not on every commit: an
+        # application crash loses nothing, but a power loss or OS crash can
+        # roll back the last commits (events and outbox rows alike) without
+        # corrupting the file. FULL would make each commit durable at the
+        # cost of an fsync per write
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
     @staticmethod
     def get_connection():
-        """Create and return a database connection with error handling."""
-        try:
-            conn = sqlite3.connect(DB_FILE)
+        """Return the calling thread's persistent database connection."""
+        conn = getattr(_local, 'conn', None)
+        if conn is not None:
             return conn
+
+        try:
+            conn = DatabaseManager._open_connection()
         except sqlite3.Error as e:
             logging.error(f"Database connection error: {e}")
             return None
 
+        _local.conn = conn
+        with _connections_lock:
+            _connections.append(conn)
+        return conn
+
+    @staticmethod
+    def close_connection():
+        """Close the calling thread's connection, if any."""
+        conn = getattr(_local, 'conn', None)
+        if conn is None:
+            return
+        _local.conn = None
+        with _connections_lock:
+            if conn in _connections:
+                _connections.remove(conn)
+        conn.close()
+
+    @staticmethod
+    def close_all_connections():
+        """Close every connection opened by any thread (used at shutdown)."""
+        with _connections_lock:
+            conns = list(_connections)
+            _connections.clear()
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logging.error(f"Error closing database connection: {e}")
+
+    @staticmethod
+    def get_schema_version(conn):
+        """Return the schema version stored in PRAGMA user_version."""
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+    @staticmethod
+    def migrate(conn):
+        """Apply pending schema migrations and return the resulting version."""
+        version = DatabaseManager.get_schema_version(conn)
+
+        for target, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            if conn.in_transaction:
+                conn.commit()
+            try:
+                # sqlite3 runs DDL in autocommit; an explicit transaction makes
+                # each migration and its version bump apply together or not at all
+                conn.execute("BEGIN")
+                for statement in statements:
+                    conn.execute(statement)
+                # PRAGMA does not accept bound parameters
+                conn.execute(f"PRAGMA user_version = {target}")
+                conn.commit()
+                logging.info(f"Applied database migration {target}")
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+
+        return max(version, len(MIGRATIONS))
+
+    @staticmethod
+    def check_query_plans():
+        """Return the hot queries whose plan falls back to a table scan or sort."""
+        conn = DatabaseManager.get_connection()
+        if not conn:
+            return []
+
+        slow_queries = []
+        for sql, params in HOT_QUERIES:
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+            details = [row[-1] for row in plan]
+            if any(
+                (detail.startswith('SCAN') and 'INDEX' not in detail)
+                or 'TEMP B-TREE' in detail
+                for detail in details
+            ):
+                slow_queries.append((sql, details))
+        return slow_queries
+
     @staticmethod
     def init_db(initial_data=None):
         """Initialize database and populate with initial data if empty."""
@@ -22,10 +268,9 @@ class DatabaseManager:
         if not conn:
             logging.error("Failed to initialize database")
             return False
-        
+
         try:
-            cursor = conn.cursor()
-            cursor.execute("""
+            conn.execute("""
                 CREATE TABLE IF NOT EXISTS events (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     type TEXT,
@@ -33,44 +278,158 @@ class DatabaseManager:
                     img TEXT
                 )
             """)
-            
+
+            version = DatabaseManager.migrate(conn)
+
             if initial_data:
-                cursor.executemany(
-                    "INSERT INTO events (type, time, img) VALUES (?, ?, ?)",
+                conn.executemany(
+                    "INSERT OR IGNORE INTO events (type, time, img) VALUES (?, ?, ?)",
                     initial_data
                 )
-            
+
+            has_sessions = conn.execute("SELECT 1 FROM sessions LIMIT 1").fetchone()
+            if initial_data or not has_sessions:
+                DatabaseManager.rebuild_sessions(conn)
+
             conn.commit()
-            logging.info("Database initialized successfully")
+            logging.info(f"Database initialized successfully (schema v{version})")
+
+            for sql, details in DatabaseManager.check_query_plans():
+                logging.warning(f"Query not served by an index: {sql} -> {details}")
             return True
         except sqlite3.Error as e:
+            conn.rollback()
             logging.error(f"Database initialization error: {e}")
             return False
-        finally:
-            conn.close()
 
     @staticmethod
     def log_event(event_type, event_time, img_url):
-        """Log a new event to the database."""
+        """Log a new event. Returns False for errors and already-logged events."""
         conn = DatabaseManager.get_connection()
         if not conn:
             logging.error("Failed to log event - database connection failed")
             return False
-        
+
         try:
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO events (type, time, img) VALUES (?, ?, ?)",
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO events (type, time, img) VALUES (?, ?, ?)",
                 (event_type, event_time, img_url)
             )
+            if cursor.rowcount:
+                DatabaseManager.record_session(conn, cursor.lastrowid, event_type, event_time)
             conn.commit()
+            if cursor.rowcount == 0:
+                logging.info(f"Duplicate event ignored: {event_type} at {event_time}")
+                return False
             logging.info(f"Event logged successfully: {event_type}")
             return True
         except sqlite3.Error as e:
+            conn.rollback()
             logging.error(f"Error logging event: {e}")
             return False
-        finally:
-            conn.close()
+
+    @staticmethod
+    def record_session(conn, event_id, event_type, event_time):
+        """Fold a just-inserted event into the sessions table (caller commits)."""
+        latest = conn.execute(LATEST_SESSIONS_SQL, (1,)).fetchone()
+        if latest and event_time < latest[3]:
+            # Out-of-order event: recompute the sessions it can affect
+            DatabaseManager.rebuild_sessions(conn, since=event_time)
+            return
+
+        if latest and latest[1] == event_type:
+            conn.execute(
+                "UPDATE sessions SET last_time = ?, last_event_id = ? WHERE id = ?",
+                (event_time, event_id, latest[0])
+            )
+            return
+
+        if latest:
+            conn.execute(
+                "UPDATE sessions SET end_time = ?, duration = ? - start_time WHERE id = ?",
+                (event_time, event_time, latest[0])
+            )
+        conn.execute(
+            "INSERT INTO sessions (location, start_time, last_time, last_event_id) VALUES (?, ?, ?, ?)",
+            (event_type, event_time, event_time, event_id)
+        )
+
+    @staticmethod
+    def rebuild_sessions(conn, since=None):
+        """Recompute sessions from events (caller commits). Returns the rows written.
+
+        With `since`, only sessions from the one before the session holding
+        that time onward are rebuilt.
+        """
+        from_time = None
+        if since is not None:
+            row = conn.execute(
+                "SELECT start_time FROM sessions WHERE start_time <= ? "
+                "ORDER BY start_time DESC, id DESC LIMIT 1 OFFSET 1",
+                (since,)
+            ).fetchone()
+            from_time = row[0] if row else None
+
+        if from_time is None:
+            conn.execute("DELETE FROM sessions")
+            events = conn.execute("SELECT id, type, time FROM events ORDER BY time, id")
+        else:
+            conn.execute("DELETE FROM sessions WHERE start_time >= ?", (from_time,))
+            events = conn.execute(
+                "SELECT id, type, time FROM events WHERE time >= ? ORDER BY time, id",
+                (from_time,)
+            )
+
+        cursor = conn.executemany(
+            "INSERT INTO sessions "
+            "(location, start_time, end_time, duration, last_time, last_event_id) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            build_sessions(events)
+        )
+        return cursor.rowcount
+
+    @staticmethod
+    def check_sessions():
+        """Compare the sessions table with a rebuild from events. Returns mismatches."""
+        conn = DatabaseManager.get_connection()
+        if not conn:
+            return []
+
+        stored = conn.execute(
+            "SELECT location, start_time, end_time, duration, last_time, last_event_id "
+            "FROM sessions ORDER BY start_time, id"
+        )
+        expected = build_sessions(
+            conn.execute("SELECT id, type, time FROM events ORDER BY time, id")
+        )
+        mismatches = []
+        for index, (have, want) in enumerate(zip_longest(stored, expected)):
+            if have is None or want is None or tuple(have) != tuple(want):
+                mismatches.append((index, have and tuple(have), want))
+        for index, have, want in mismatches[:10]:
+            logging.warning(f"Session mismatch at #{index}: stored={have} expected={want}")
+        return mismatches
+
+    @staticmethod
+    def get_previous_opposite_event(event_type, event_time):
+        """Latest event of the opposite type before event_time, as (id, type, time, img)."""
+        conn = DatabaseManager.get_connection()
+        if not conn:
+            return None
+
+        opposite_type = 'out' if event_type == 'in' else 'in'
+        try:
+            row = conn.execute(PREVIOUS_SESSION_EVENT_SQL, (opposite_type, event_time)).fetchone()
+            if row and row[2] >= event_time:
+                # event_time falls inside that session; look the event up directly
+                row = conn.execute(
+                    "SELECT * FROM events WHERE type = ? AND time < ? ORDER BY time DESC LIMIT 1",
+                    (opposite_type, event_time)
+                ).fetchone()
+            return row
+        except sqlite3.Error as e:
+            logging.error(f"Error fetching previous opposite event: {e}")
+            return None
 
     @staticmethod
     def get_last_event(event_type):
@@ -78,16 +437,13 @@ class DatabaseManager:
         conn = DatabaseManager.get_connection()
         if not conn:
             return None
-            
+
         try:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT * FROM events WHERE type = ? ORDER BY time DESC LIMIT 1",
-                (event_type,)
-            )
+            cursor = conn.execute(LAST_EVENT_BY_TYPE_SQL, (event_type,))
             return cursor.fetchone()
-        finally:
-            conn.close()
+        except sqlite3.Error as e:
+            logging.error(f"Error fetching last event: {e}")
+            return None
 
     @staticmethod
     def get_location_stats():
@@ -95,37 +451,97 @@ class DatabaseManager:
         conn = DatabaseManager.get_connection()
         if not conn:
             return {}
-            
+
         try:
-            cursor = conn.cursor()
             stats = {}
-            
-            # Get last known location and duration
-            cursor.execute("""
-                SELECT type, time 
-                FROM events 
-                ORDER BY time DESC 
-                LIMIT 1
-            """)
-            last_event = cursor.fetchone()
-            
-            if last_event:
-                stats['current_location'] = last_event[0]
-                stats['current_duration'] = int(datetime.now().timestamp()) - last_event[1]
-                
-                opposite_type = 'out' if last_event[0] == 'in' else 'in'
-                cursor.execute("""
-                    SELECT time 
-                    FROM events 
-                    WHERE type = ? AND time < ? 
-                    ORDER BY time DESC 
-                    LIMIT 1
-                """, (opposite_type, last_event[1]))
-                
-                prev_event = cursor.fetchone()
-                if prev_event:
-                    stats['last_transition_duration'] = last_event[1] - prev_event[0]
-            
+
+            # The open session and the one before it hold everything needed
+            sessions = conn.execute(LATEST_SESSIONS_SQL, (2,)).fetchall()
+            if sessions:
+                _, location, _, last_time = sessions[0]
+                stats['current_location'] = location
+                stats['current_duration'] = int(datetime.now().timestamp()) - last_time
+                if len(sessions) > 1:
+                    stats['last_transition_duration'] = last_time - sessions[1][3]
+
             return stats
-        finally:
-            conn.close()
+        except sqlite3.Error as e:
+            logging.error(f"Error fetching location stats: {e}")
+            return {}
+
+    @staticmethod
+    def get_file_id(source):
+        """Get the Telegram file_id recorded for a media source."""
+        conn = DatabaseManager.get_connection()
+        if not conn:
+            return None
+
+        try:
+            row = conn.execute(
+                "SELECT file_id FROM telegram_files WHERE source = ?", (source,)
+            ).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            logging.error(f"Error fetching file_id: {e}")
+            return None
+
+    @staticmethod
+    def save_file_id(source, file_id):
+        """Record the Telegram file_id for a media source."""
+        conn = DatabaseManager.get_connection()
+        if not conn:
+            return False
+
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO telegram_files (source, file_id, updated) VALUES (?, ?, ?)",
+                (source, file_id, int(datetime.now().timestamp()))
+            )
+            conn.commit()
+            return True
+        except sqlite3.Error as e:
+            conn.rollback()
+            logging.error(f"Error saving file_id: {e}")
+            return False
+
+    @staticmethod
+    def delete_file_id(source):
+        """Forget the Telegram file_id for a media source."""
+        conn = DatabaseManager.get_connection()
+        if not conn:
+            return False
+
+        try:
+            conn.execute("DELETE FROM telegram_files WHERE source = ?", (source,))
+            conn.commit()
+            return True
+        except sqlite3.Error as e:
+            conn.rollback()
+            logging.error(f"Error deleting file_id: {e}")
+            return False
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Maintain the sessions table")
+    parser.add_argument('command', choices=['rebuild-sessions', 'check-sessions'])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if not DatabaseManager.init_db():
+        raise SystemExit(1)
+    if args.command == 'rebuild-sessions':
+        conn = DatabaseManager.get_connection()
+        started = time.perf_counter()
+        try:
+            count = DatabaseManager.rebuild_sessions(conn)
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        logging.info(f"Rebuilt {count} sessions in {time.perf_counter() - started:.2f}s")
+    else:
+        mismatches = DatabaseManager.check_sessions()
+        logging.info(f"{len(mismatches)} session mismatches")
+        raise SystemExit(1 if mismatches else 0)
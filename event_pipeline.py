@@ -0,0 +1,90 @@
+import logging
+import time
+from datetime import datetime
+from event_writer import event_writer
+from state import pepito_state
+from config import SHOW_BTC_CHARTS, EVENT_WRITE_TIMEOUT
+from bot_handlers import fetch_btc_chart_data, render_btc_chart
+from adventure_tracker import adventure_tracker
+
+# Stages shared by the threaded (main.py) and asyncio (async_runtime.py) runtimes
+
+def timed(timings, stage, func, *args, **kwargs):
+    """Run one pipeline stage and record its wall time in seconds"""
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        timings[stage] = time.perf_counter() - start
+
+def parse_pepito_event(event):
+    """Decode an SSE event; returns the pepito event dict, or None to skip it"""
+    try:
+        data = event.json()
+    except ValueError as e:  # json and orjson decode errors are ValueErrors
+        logging.error(f"JSON parsing error: {e}")
+        return None
+    if not isinstance(data, dict):
+        logging.error(f"Skipping SSE payload that is not an object: {event.data[:200]!r}")
+        return None
+    if data.get("event") != "pepito":
+        return None
+    if (data.get("type") not in ('in', 'out') or not isinstance(data.get("time"), int)
+            or "img" not in data):
+        logging.error(f"Skipping malformed pepito event: {event.data[:200]!r}")
+        return None
+    return data
+
+def store_event(event_type, event_time, img_url):
+    """DB stage: log the event and apply it to the live state"""
+    # Group-committed with any other writes in flight; waits for the commit.
+    # A timeout raises, so the outbox releases the event and retries it
+    if not event_writer.submit(event_type, event_time, img_url).result(timeout=EVENT_WRITE_TIMEOUT):
+        return False
+
+    pepito_state.record_event(event_type, event_time, img_url)
+    if SHOW_BTC_CHARTS:
+        # Start precomputing the chart of the adventure this event opens
+        adventure_tracker.begin(event_type, event_time)
+    if pepito_state.check_consistency():
+        pepito_state.invalidate()
+    return True
+
+def fetch_adventure_chart_data(start_time, end_time):
+    """Chart candles for a finished adventure, precomputed by the tracker when possible"""
+    try:
+        candles = adventure_tracker.finish(start_time, end_time)
+    except Exception as e:
+        logging.error(f"Error finishing tracked adventure: {e}")
+        candles = None
+    if candles is None or candles.empty:
+        return fetch_btc_chart_data(start_time, end_time)
+
+    # Already loaded: the tracker fetched its candles through the chart generator
+    from chart_generator import to_chart_resolution
+    return to_chart_resolution(candles, end_time - start_time)
+
+def prepare_chart(timings, start_time, end_time, duration_str, event_type):
+    """Chart stage: fetch the OHLCV data and render the chart once per event"""
+    ohlcv = timed(timings, 'chart_data', fetch_adventure_chart_data, start_time, end_time)
+    if ohlcv is None:
+        return None
+    return timed(
+        timings, 'chart_render', render_btc_chart,
+        start_time, end_time, duration_str, event_type, ohlcv=ohlcv
+    )
+
+def describe_event(event_time, prev_event):
+    """Return the (time_str, duration_str) used in event captions"""
+    time_str = datetime.utcfromtimestamp(event_time).strftime('%Y-%m-%d %H:%M:%S UTC')
+    duration_str = None
+    if prev_event:
+        duration = event_time - prev_event[2]
+        duration_str = f"{duration // 3600}h {(duration % 3600) // 60}m"
+    return time_str, duration_str
+
+def log_timings(timings):
+    logging.info(
+        "Event pipeline timings: "
+        + ", ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in timings.items())
+    )
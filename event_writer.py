@@ -0,0 +1,173 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from config import EVENT_WRITE_BATCH_SIZE, EVENT_WRITE_MAX_LATENCY
+from database import DatabaseManager
+
+_STOP = object()
+# Seconds after an overlapping submit during which every insert goes
+# through the writer thread
+_CONTENTION_WINDOW = 1.0
+
+class EventWriter:
+    """Single writer thread that group-commits event inserts.
+
+    Callers get a Future that resolves once their row is committed:
+    True if it was inserted, False for duplicates and errors (the same
+    contract as DatabaseManager.log_event). A batch is committed when it
+    reaches max_batch rows or when its oldest row has waited max_latency
+    seconds, so one commit covers every insert that arrived meanwhile.
+
+    An event submitted while nothing else is in flight, and none has
+    overlapped recently, is committed on the caller's thread instead: it
+    has nothing to share a commit with, and the hand-off to the writer
+    thread would only add latency.
+    """
+
+    def __init__(self, max_batch=EVENT_WRITE_BATCH_SIZE, max_latency=EVENT_WRITE_MAX_LATENCY):
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        # Held for every commit, so inline commits never race the writer
+        self._commit_lock = threading.Lock()
+        self._committing = False
+        self._overlapped_at = float('-inf')
+        self.batches = 0
+        self.events = 0
+        self.largest_batch = 0
+
+    def start(self):
+        """Start the writer thread (idempotent; restarts it if it died)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='event-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Commit everything already submitted, then stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def submit(self, event_type, event_time, img_url):
+        """Queue one event insert; returns a Future[bool]."""
+        future = Future()
+        item = ((event_type, event_time, img_url), future)
+        now = time.monotonic()
+        if now - self._overlapped_at > _CONTENTION_WINDOW:
+            if self._committing or not self._queue.empty():
+                self._overlapped_at = now
+            else:
+                with self._commit_lock:
+                    self._commit_guarded([item])
+                return future
+
+        self.start()
+        self._queue.put(item)
+        return future
+
+    def submit_many(self, events):
+        """Queue (type, time, img) rows; returns one Future per row."""
+        items = [(tuple(event), Future()) for event in events]
+        self.start()
+        for item in items:
+            self._queue.put(item)
+        return [future for _, future in items]
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_latency
+            stopping = False
+
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            with self._commit_lock:
+                self._commit_guarded(batch)
+            if stopping:
+                return
+
+    def _commit_guarded(self, batch):
+        """_commit that fails the batch's futures instead of raising."""
+        self._committing = True
+        try:
+            self._commit(batch)
+        except Exception as e:
+            # Raising would kill the writer thread and leave every caller
+            # waiting on a future nothing resolves
+            logging.error(f"Error committing event batch of {len(batch)}: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._committing = False
+
+    def _commit(self, batch):
+        """Insert and commit a batch in one transaction, resolving its futures."""
+        conn = DatabaseManager.get_connection()
+        if not conn:
+            logging.error("Failed to log events - database connection failed")
+            for _, future in batch:
+                future.set_result(False)
+            return
+
+        try:
+            inserted = []
+            for row, _ in batch:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO events (type, time, img) VALUES (?, ?, ?)", row
+                )
+                if cursor.rowcount > 0:
+                    DatabaseManager.record_session(conn, cursor.lastrowid, row[0], row[1])
+                inserted.append(cursor.rowcount > 0)
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logging.error(f"Error committing event batch of {len(batch)}, retrying one by one: {e}")
+            for row, future in batch:
+                future.set_result(DatabaseManager.log_event(*row))
+            return
+        except Exception:
+            conn.rollback()
+            raise
+
+        self.batches += 1
+        self.events += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for (row, future), was_inserted in zip(batch, inserted):
+            if was_inserted:
+                logging.info(f"Event logged successfully: {row[0]}")
+            else:
+                logging.info(f"Duplicate event ignored: {row[0]} at {row[1]}")
+            future.set_result(was_inserted)
+
+    def get_metrics(self):
+        """Return batch counters."""
+        return {
+            'batches': self.batches,
+            'events': self.events,
+            'largest_batch': self.largest_batch,
+            'avg_batch': self.events / self.batches if self.batches else 0.0
+        }
+
+event_writer = EventWriter()
@@ -1,86 +1,219 @@
-import json
+import sys
 import threading
 import requests
 import logging
 import time
-import queue
+from concurrent.futures import ThreadPoolExecutor
 from telebot import TeleBot
 from config import (
     BOT_TOKEN, MAX_RETRIES, BACKOFF_FACTOR, 
-    STREAM_TIMEOUT, POLLING_TIMEOUT, SSE_URL
+    STREAM_TIMEOUT, POLLING_TIMEOUT, SSE_URL, SSE_BACKOFF_MAX,
+    AUTHORIZED_USERS, AUTHORIZED_GROUPS, SHOW_BTC_CHARTS,
+    EVENT_PIPELINE_WORKERS, RUNTIME_MODE, MEDIA_OPTIMIZE,
+    CHART_PREWARM_DELAY, CANDLE_FEED_ENABLED, CHART_BACKEND,
+    METRICS_LOG_INTERVAL
 )
 from database import DatabaseManager
-from utils import setup_logging, ensure_image_directory
-from bot_handlers import create_session
+from state import pepito_state
+from chart_renderer import chart_renderer
+from event_writer import event_writer
+from candle_store import candle_store
+from chart_cache import satoshi_chart_cache
+from singleflight import flight
+from adventure_tracker import adventure_tracker
+from utils import setup_logging, ensure_image_directory, log_startup_report
+from media_catalog import media_catalog
+from bot_handlers import (
+    create_session, download_photo, get_status_caption, prewarm_charting,
+    start_candle_feed, stop_candle_feed,
+    send_rendered_chart, send_telegram_photo_with_caption
+)
+from event_pipeline import (
+    timed, parse_pepito_event, store_event, prepare_chart, describe_event, log_timings
+)
 from command_handlers import register_handlers
+from sse import SSEParser, iter_response_chunks, reconnect_delay
+from outbox import outbox
 
-def listen_to_sse(event_queue, session):
-    """Enhanced SSE listener with connection pooling"""
+def listen_to_sse(outbox, session):
+    """Resumable SSE listener: resumes with Last-Event-ID, backs off with jitter"""
+    last_event_id = None
+    retry_ms = None
+    attempt = 0
     while True:
         try:
-            logging.info("Connecting to SSE stream...")
-            with session.get(SSE_URL, stream=True, timeout=STREAM_TIMEOUT) as response:
+            headers = {'Accept': 'text/event-stream'}
+            if last_event_id:
+                headers['Last-Event-ID'] = last_event_id
+            logging.info(f"Connecting to SSE stream (Last-Event-ID: {last_event_id})...")
+            with session.get(SSE_URL, stream=True, timeout=STREAM_TIMEOUT, headers=headers) as response:
                 response.raise_for_status()
                 
-                for line in response.iter_lines():
-                    if line:
-                        try:
-                            line = line.decode("utf-8").lstrip("data: ").strip()
-                            data = json.loads(line)
-                            
-                            if data.get("event") == "pepito":
-                                event_queue.put(data)
-                        except json.JSONDecodeError as e:
-                            logging.error(f"JSON parsing error: {e}")
-                            continue
+                parser = SSEParser(last_event_id)
+                for chunk in iter_response_chunks(response):
+                    for event in parser.feed(chunk):
+                        attempt = 0
+                        # Malformed events are logged and skipped; raising here
+                        # would reconnect and replay the same event forever
+                        data = parse_pepito_event(event)
+                        if data:
+                            outbox.put(data)
+                        # Resume after the last event handled; the parser may
+                        # already hold the id of a frame that is not complete
+                        last_event_id = event.id
+                    retry_ms = parser.retry or retry_ms
+            logging.warning("SSE stream closed by server")
                             
         except Exception as e:
             logging.error(f"SSE connection error: {e}")
-            time.sleep(BACKOFF_FACTOR * 2)
+        
+        # Server retry hint, if any, is the base delay; cap and jitter avoid a thundering herd
+        base = retry_ms / 1000 if retry_ms else BACKOFF_FACTOR * 2
+        delay = reconnect_delay(attempt, base, SSE_BACKOFF_MAX)
+        attempt += 1
+        logging.info(f"Reconnecting to SSE stream in {delay:.1f}s")
+        time.sleep(delay)
+
+def deliver_photos(bot, recipients, event_type, time_str, duration_str, img_url, photo_bytes):
+    """Send the event photo and status caption to every recipient; returns {chat_id: delivered}"""
+    results = {}
+    for chat_id in recipients:
+        try:
+            caption = get_status_caption(chat_id, event_type, time_str, duration_str)
+            results[chat_id] = send_telegram_photo_with_caption(
+                bot, chat_id, img_url, caption, photo_bytes=photo_bytes
+            )
+        except Exception as e:
+            logging.error(f"Error sending update to {chat_id}: {e}")
+            results[chat_id] = False
+    return results
+
+def deliver_charts(bot, recipients, chart):
+    """Send the rendered Bitcoin chart for the finished adventure to every recipient"""
+    results = {}
+    for chat_id in recipients:
+        try:
+            results[chat_id] = send_rendered_chart(bot, chat_id, chart)
+        except Exception as e:
+            logging.error(f"Error sending chart to {chat_id}: {e}")
+            results[chat_id] = False
+    return results
+
+def process_event(bot, entry, pipeline):
+    """Run one outbox event through the staged pipeline.
+
+    The DB write, photo download and chart fetch/render start together;
+    photo delivery begins as soon as the photo is ready and the chart,
+    rendered once, follows. Only chats without a recorded delivery are
+    sent to, so a resumed event never reaches a chat twice.
+    """
+    timings = {}
+    started = time.perf_counter()
+    outbox_id, event_type, event_time, img_url = entry
+
+    # Previous opposite event comes from memory so the chart fetch can start now
+    prev_event = pepito_state.get_previous_opposite_event(event_type, event_time)
+    with_chart = bool(prev_event and SHOW_BTC_CHARTS)
+
+    recipients = AUTHORIZED_USERS + AUTHORIZED_GROUPS
+    outbox.add_deliveries(outbox_id, 'photo', recipients)
+    if with_chart:
+        outbox.add_deliveries(outbox_id, 'chart', recipients)
+    photo_recipients = outbox.pending_deliveries(outbox_id, 'photo')
+    chart_recipients = outbox.pending_deliveries(outbox_id, 'chart') if with_chart else []
+
+    # The outbox only holds new events, so a False here means an earlier attempt logged it
+    db_future = pipeline.submit(timed, timings, 'db', store_event, event_type, event_time, img_url)
+    photo_future = None
+    if photo_recipients:
+        photo_future = pipeline.submit(timed, timings, 'photo', download_photo, img_url)
+
+    time_str, duration_str = describe_event(event_time, prev_event)
+
+    chart_future = None
+    if chart_recipients:
+        chart_future = pipeline.submit(
+            prepare_chart, timings, prev_event[2], event_time, duration_str, event_type
+        )
+
+    if photo_future:
+        photo_bytes = photo_future.result()
+        results = timed(
+            timings, 'photo_delivery', deliver_photos,
+            bot, photo_recipients, event_type, time_str, duration_str, img_url, photo_bytes
+        )
+        outbox.record_deliveries(outbox_id, 'photo', results)
 
-def process_events(bot, event_queue):
-    """Process events from queue with Bitcoin chart integration"""
+    if chart_future:
+        chart = chart_future.result()
+        if chart:
+            results = timed(timings, 'chart_delivery', deliver_charts, bot, chart_recipients, chart)
+            outbox.record_deliveries(outbox_id, 'chart', results)
+        else:
+            outbox.skip_deliveries(outbox_id, 'chart')
+
+    # Waited for last so delivery never queues behind the write; a failed
+    # write raises here and the event is retried for the chats still missing
+    db_future.result()
+
+    timings['total'] = time.perf_counter() - started
+    log_timings(timings)
+
+def process_events(bot, outbox):
+    """Claim events from the outbox in batches and process them in order"""
+    pipeline = ThreadPoolExecutor(
+        max_workers=EVENT_PIPELINE_WORKERS,
+        thread_name_prefix='event-pipeline'
+    )
+    outbox.recover()
     while True:
         try:
-            data = event_queue.get()
-            event_type = data["type"]
-            event_time = data["time"]
-            img_url = data["img"]
-            
-            if DatabaseManager.log_event(event_type, event_time, img_url):
-                # Get previous event for duration calculation
-                prev_event = DatabaseManager.get_previous_opposite_event(event_type, event_time)
-                
-                time_str = datetime.utcfromtimestamp(event_time).strftime('%Y-%m-%d %H:%M:%S UTC')
-                duration_str = None
-                
-                if prev_event:
-                    duration = event_time - prev_event[2]
-                    duration_str = f"{duration // 3600}h {(duration % 3600) // 60}m"
-                
-                for chat_id in AUTHORIZED_USERS + AUTHORIZED_GROUPS:
-                    try:
-                        # Send status update with duration info if available
-                        caption = get_status_caption(chat_id, event_type, time_str, duration_str)
-                        send_telegram_photo_with_caption(bot, chat_id, img_url, caption)
-                        
-                        # Send Bitcoin chart if we have duration data
-                        if prev_event and SHOW_BTC_CHARTS:
-                            send_btc_chart(
-                                bot, chat_id,
-                                prev_event[2],
-                                event_time,
-                                duration_str,
-                                event_type
-                            )
-                    except Exception as e:
-                        logging.error(f"Error sending update to {chat_id}: {e}")
+            batch = outbox.claim()
+            if not batch:
+                outbox.wait()
+                continue
+
+            for entry in batch:
+                try:
+                    process_event(bot, entry, pipeline)
+                    outbox.complete(entry[0])
+                except Exception as e:
+                    logging.error(f"Error processing event: {e}")
+                    outbox.release(entry[0])
+        except Exception as e:
+            logging.error(f"Error claiming events: {e}")
+            time.sleep(BACKOFF_FACTOR)
+
+def collect_metrics():
+    """Gather the counters of the caches, stores and workers in use."""
+    metrics = {
+        'state': pepito_state.get_metrics(),
+        'event_writer': event_writer.get_metrics(),
+        'media_catalog': media_catalog.get_metrics(),
+        'candle_store': candle_store.get_metrics(),
+        'satoshi_chart_cache': satoshi_chart_cache.get_metrics(),
+        'singleflight': flight.get_metrics(),
+        'chart_renderer': chart_renderer.get_metrics(),
+    }
+    # Only once charting started: importing the feed would load the chart stack
+    feed = sys.modules.get('candle_feed')
+    if feed is not None:
+        metrics['candle_feed'] = feed.candle_feed.get_metrics()
+    return metrics
+
+def log_metrics(interval):
+    """Log collect_metrics() every `interval` seconds"""
+    while True:
+        time.sleep(interval)
+        try:
+            for name, values in collect_metrics().items():
+                logging.info(f"Metrics {name}: {values}")
         except Exception as e:
-            logging.error(f"Error processing event: {e}")
-        finally:
-            event_queue.task_done()
+            logging.error(f"Error collecting metrics: {e}")
 
 def main():
+    started = time.perf_counter()
+
     # Setup logging
     setup_logging()
     logging.info("Starting Pépito Bot...")
@@ -89,13 +222,54 @@ def main():
     if not ensure_image_directory():
         logging.critical("Failed to create images directory")
         return
+    media_catalog.refresh(force=True)
+    if MEDIA_OPTIMIZE:
+        # Originals are served until the optimized copies are ready
+        threading.Thread(target=media_catalog.optimize, name='media-optimizer', daemon=True).start()
     
     # Initialize database
     if not DatabaseManager.init_db():
         logging.critical("Failed to initialize database")
         return
     
+    # Load Pépito's live state once; the event processor keeps it current
+    pepito_state.load()
+    
+    # Resume precomputing the chart of the adventure in progress
+    last_event = pepito_state.get_last_event()
+    if SHOW_BTC_CHARTS and last_event:
+        adventure_tracker.begin(last_event[1], last_event[2])
+    
+    # Warm the chart renderers before the first event needs one
+    if SHOW_BTC_CHARTS:
+        if CHART_BACKEND == 'plotly':
+            # The raster backend needs no Kaleido workers; its rare Plotly
+            # fallback renders in-process
+            chart_renderer.start()
+        if CANDLE_FEED_ENABLED:
+            # Started off the main thread: the feed imports ccxt
+            threading.Thread(target=start_candle_feed, name='candle-feed-start', daemon=True).start()
+        if CHART_PREWARM_DELAY >= 0:
+            # Import the charting stack off the critical path, once polling is up
+            prewarm = threading.Timer(CHART_PREWARM_DELAY, prewarm_charting)
+            prewarm.daemon = True
+            prewarm.start()
+    
+    if METRICS_LOG_INTERVAL > 0:
+        threading.Thread(
+            target=log_metrics, args=(METRICS_LOG_INTERVAL,), name='metrics', daemon=True
+        ).start()
+    
+    log_startup_report(started)
+    
     try:
+        if RUNTIME_MODE == 'asyncio':
+            # Imported lazily so the threaded mode does not need aiohttp
+            from async_runtime import run_async
+            logging.info("Running in asyncio mode")
+            run_async()
+            return
+        
         # Initialize bot
         bot = TeleBot(BOT_TOKEN)
         bot.timeout = POLLING_TIMEOUT
@@ -103,14 +277,13 @@ def main():
         # Register command handlers
         bot = register_handlers(bot)
         
-        # Initialize event queue and session
-        event_queue = queue.Queue()
+        # Event hand-off goes through the durable outbox
         session = create_session()
         
         # Start SSE listener thread
         sse_thread = threading.Thread(
             target=listen_to_sse,
-            args=(event_queue, session),
+            args=(outbox, session),
             daemon=True
         )
         sse_thread.start()
@@ -119,7 +292,7 @@ def main():
         # Start event processor thread
         processor_thread = threading.Thread(
             target=process_events,
-            args=(bot, event_queue),
+            args=(bot, outbox),
             daemon=True
         )
         processor_thread.start()
@@ -138,6 +311,12 @@ def main():
     except Exception as e:
         logging.critical(f"Critical error: {e}")
         return
+    finally:
+        chart_renderer.stop()
+        stop_candle_feed()
+        adventure_tracker.stop()
+        event_writer.stop()
+        DatabaseManager.close_all_connections()
 
 if __name__ == "__main__":
     main()
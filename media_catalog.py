@@ -0,0 +1,100 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from config import IMAGES_DIR, MEDIA_RESCAN_INTERVAL, MEDIA_OPTIMIZE
+from media_optimizer import optimize_directory, optimized_path, manifest_key
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+GIF_EXTENSIONS = ('.gif',)
+
+# `path` is what gets uploaded: the optimized copy when one exists.
+# `source` keys the telegram_files table; it changes when the file does,
+# so an edited meme is uploaded again instead of reusing a stale file_id
+MediaItem = namedtuple('MediaItem', ['path', 'source', 'is_gif'])
+
+class MediaCatalog:
+    """In-memory index of the meme/GIF directory.
+
+    Built once at startup and rebuilt only when the directory's mtime
+    changes (checked at most every rescan_interval seconds), so picking
+    a random meme is a list index instead of a listdir per command.
+    """
+
+    def __init__(self, directory=IMAGES_DIR, rescan_interval=MEDIA_RESCAN_INTERVAL):
+        self.directory = directory
+        self.rescan_interval = rescan_interval
+        self._lock = threading.Lock()
+        self._all = []
+        self._gifs = []
+        self._dir_mtime = None
+        self._checked_at = None
+        self.scans = 0
+
+    def refresh(self, force=False):
+        """Rescan the directory if it changed since the last scan."""
+        now = time.monotonic()
+        with self._lock:
+            if (not force and self._checked_at is not None
+                    and now - self._checked_at < self.rescan_interval):
+                return
+            self._checked_at = now
+
+        try:
+            dir_mtime = os.stat(self.directory).st_mtime_ns
+        except OSError as e:
+            logging.error(f"Images directory {self.directory} not available: {e}")
+            with self._lock:
+                self._all, self._gifs, self._dir_mtime = [], [], None
+            return
+
+        with self._lock:
+            if not force and dir_mtime == self._dir_mtime:
+                return
+
+        items, gifs = self._scan()
+        with self._lock:
+            self._all, self._gifs, self._dir_mtime = items, gifs, dir_mtime
+            self.scans += 1
+        logging.info(f"Media catalog loaded: {len(items)} files ({len(gifs)} GIFs)")
+
+    def _scan(self):
+        items, gifs = [], []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                name = entry.name.lower()
+                is_gif = name.endswith(GIF_EXTENSIONS)
+                if not (is_gif or name.endswith(IMAGE_EXTENSIONS)) or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                optimized = optimized_path(entry.name, stat) if MEDIA_OPTIMIZE else None
+                if optimized:
+                    # Cached outputs are named by content hash
+                    item = MediaItem(optimized, f"media:{os.path.basename(optimized)}", is_gif)
+                else:
+                    item = MediaItem(entry.path, f"media:{manifest_key(entry.name, stat)}", is_gif)
+                items.append(item)
+                if is_gif:
+                    gifs.append(item)
+        return items, gifs
+
+    def optimize(self):
+        """Pre-optimize the directory's media, then serve the optimized copies."""
+        report = optimize_directory(self.directory)
+        self.refresh(force=True)
+        return report
+
+    def random_item(self, gif_only=False):
+        """Pick a random MediaItem, or None if there is nothing to pick."""
+        self.refresh()
+        with self._lock:
+            items = self._gifs if gif_only else self._all
+            return random.choice(items) if items else None
+
+    def get_metrics(self):
+        with self._lock:
+            return {'files': len(self._all), 'gifs': len(self._gifs), 'scans': self.scans}
+
+media_catalog = MediaCatalog()
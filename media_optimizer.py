@@ -0,0 +1,183 @@
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+from config import (
+    IMAGES_DIR, MEDIA_CACHE_DIR, MEDIA_MAX_PHOTO_SIDE,
+    MEDIA_JPEG_QUALITY, MEDIA_VIDEO_CRF
+)
+
+PHOTO_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+GIF_EXTENSIONS = ('.gif',)
+FFMPEG_TIMEOUT = 120
+MANIFEST_NAME = 'manifest.json'
+
+# "name:mtime_ns:size" -> cached output file name (or None when the original
+# is kept), written by optimize_directory so lookups never read the media
+_manifest = None
+
+def content_hash(path):
+    """SHA-256 of a file's bytes (hex, truncated); names the cached output."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()[:32]
+
+def _output_paths(digest, path):
+    """Return (output, marker) paths for a source file's content hash."""
+    suffix = '.mp4' if path.lower().endswith(GIF_EXTENSIONS) else '.jpg'
+    output = os.path.join(MEDIA_CACHE_DIR, digest + suffix)
+    # The marker records that optimizing did not help, so it is not retried
+    return output, output + '.keep'
+
+def _convert_gif(source, output):
+    """Convert an animated GIF to a silent H.264 MP4 (Telegram shows it as a GIF)."""
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        return False
+    subprocess.run(
+        [
+            ffmpeg, '-y', '-loglevel', 'error', '-i', source,
+            '-movflags', '+faststart', '-pix_fmt', 'yuv420p',
+            # yuv420p needs even dimensions
+            '-vf', 'scale=trunc(iw/2)*2:trunc(ih/2)*2',
+            '-c:v', 'libx264', '-crf', str(MEDIA_VIDEO_CRF), '-an', output
+        ],
+        check=True, timeout=FFMPEG_TIMEOUT
+    )
+    return True
+
+def _convert_photo(source, output):
+    """Downscale a photo to MEDIA_MAX_PHOTO_SIDE and recompress it as JPEG."""
+    try:
+        # Imported on first use: the catalog using this module loads at startup
+        from PIL import Image, ImageOps
+    except ImportError:  # Pillow is only needed to recompress photos
+        return False
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((MEDIA_MAX_PHOTO_SIDE, MEDIA_MAX_PHOTO_SIDE))
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.save(output, 'JPEG', quality=MEDIA_JPEG_QUALITY, optimize=True, progressive=True)
+    return True
+
+def optimize_file(path):
+    """Optimize one media file into the cache.
+
+    Returns (optimized_path or None, original_bytes, optimized_bytes).
+    Already-processed content is not converted again.
+    """
+    original_size = os.path.getsize(path)
+    digest = content_hash(path)
+    output, marker = _output_paths(digest, path)
+
+    if os.path.exists(output):
+        return output, original_size, os.path.getsize(output)
+    if os.path.exists(marker):
+        return None, original_size, original_size
+
+    os.makedirs(MEDIA_CACHE_DIR, exist_ok=True)
+    partial = output + '.part' + os.path.splitext(output)[1]
+    try:
+        if path.lower().endswith(GIF_EXTENSIONS):
+            converted = _convert_gif(path, partial)
+        else:
+            converted = _convert_photo(path, partial)
+    except Exception as e:
+        logging.error(f"Error optimizing {path}: {e}")
+        converted = False
+
+    if not converted or not os.path.exists(partial):
+        if os.path.exists(partial):
+            os.remove(partial)
+        return None, original_size, original_size
+
+    optimized_size = os.path.getsize(partial)
+    if optimized_size >= original_size:
+        os.remove(partial)
+        open(marker, 'w').close()
+        return None, original_size, original_size
+
+    os.replace(partial, output)
+    return output, original_size, optimized_size
+
+def optimize_directory(directory=IMAGES_DIR):
+    """Optimize every GIF and photo in a directory and log the bytes saved.
+
+    Returns a list of (file name, original_bytes, optimized_bytes).
+    """
+    if not shutil.which('ffmpeg'):
+        logging.warning("ffmpeg not found; GIFs will be served unconverted")
+    if importlib.util.find_spec('PIL') is None:
+        logging.warning("Pillow not installed; photos will be served unconverted")
+
+    report = []
+    manifest = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith(PHOTO_EXTENSIONS + GIF_EXTENSIONS):
+            continue
+        path = os.path.join(directory, name)
+        stat = os.stat(path)
+        output, original_size, optimized_size = optimize_file(path)
+        manifest[manifest_key(name, stat)] = os.path.basename(output) if output else None
+        report.append((name, original_size, optimized_size))
+        if optimized_size < original_size:
+            logging.info(
+                f"Optimized {name}: {original_size} -> {optimized_size} bytes "
+                f"({original_size - optimized_size} saved)"
+            )
+
+    original_total = sum(row[1] for row in report)
+    saved_total = original_total - sum(row[2] for row in report)
+    logging.info(
+        f"Media optimization: {len(report)} files, {saved_total} of "
+        f"{original_total} bytes saved"
+    )
+    _save_manifest(manifest)
+    return report
+
+def manifest_key(name, stat):
+    """Manifest key of a media file: changes whenever the file is replaced or edited."""
+    return f"{name}:{stat.st_mtime_ns}:{stat.st_size}"
+
+def _save_manifest(manifest):
+    global _manifest
+    os.makedirs(MEDIA_CACHE_DIR, exist_ok=True)
+    path = os.path.join(MEDIA_CACHE_DIR, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    os.replace(path + '.tmp', path)
+    _manifest = manifest
+
+def _load_manifest():
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(os.path.join(MEDIA_CACHE_DIR, MANIFEST_NAME)) as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+def optimized_path(name, stat):
+    """Return the cached optimized version of a file, or None to serve the original.
+
+    Only the manifest is consulted; files the optimizer has not processed
+    yet are served as they are.
+    """
+    output = _load_manifest().get(manifest_key(name, stat))
+    if output is None:
+        return None
+    output = os.path.join(MEDIA_CACHE_DIR, output)
+    return output if os.path.exists(output) else None
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    for name, original, optimized in optimize_directory(sys.argv[1] if len(sys.argv) > 1 else IMAGES_DIR):
+        print(f"{name}\t{original}\t{optimized}\t{original - optimized}")
@@ -0,0 +1,217 @@
+import logging
+import sqlite3
+import threading
+import time
+from config import (
+    OUTBOX_MAX_DEPTH, OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_CLAIM_TIMEOUT, OUTBOX_POLL_INTERVAL, OUTBOX_RETRY_BACKOFF
+)
+from database import DatabaseManager
+
+class Outbox:
+    """SQLite-backed hand-off between the SSE listener and the event processor.
+
+    Each event is a row in `outbox` (pending -> claimed -> removed when
+    every chat got it, or kept as 'failed' once OUTBOX_MAX_ATTEMPTS are
+    spent or a delivery failed for good); each chat it must reach is a row
+    in `outbox_deliveries`. Released events wait an exponential backoff
+    before they are claimed again. Work survives restarts: claimed rows
+    are released on startup and only undelivered chats are retried.
+    """
+
+    def __init__(self, max_depth=OUTBOX_MAX_DEPTH, batch_size=OUTBOX_BATCH_SIZE,
+                 max_attempts=OUTBOX_MAX_ATTEMPTS, claim_timeout=OUTBOX_CLAIM_TIMEOUT,
+                 retry_backoff=OUTBOX_RETRY_BACKOFF):
+        self.max_depth = max_depth
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.claim_timeout = claim_timeout
+        self.retry_backoff = retry_backoff
+        self._wakeup = threading.Event()
+
+    @staticmethod
+    def _connection():
+        conn = DatabaseManager.get_connection()
+        if not conn:
+            raise sqlite3.OperationalError("Outbox database connection failed")
+        return conn
+
+    def depth(self):
+        """Number of events waiting for or undergoing processing."""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM outbox WHERE state IN ('pending', 'claimed')"
+        ).fetchone()[0]
+
+    def put(self, data):
+        """Enqueue an SSE event, blocking while the outbox is full.
+
+        Returns False for events already queued or already logged.
+        """
+        warned = False
+        while self.depth() >= self.max_depth:
+            if not warned:
+                logging.warning(f"Outbox full ({self.max_depth} events), applying backpressure")
+                warned = True
+            time.sleep(OUTBOX_POLL_INTERVAL)
+
+        conn = self._connection()
+        try:
+            cursor = conn.execute(
+                """
+                INSERT OR IGNORE INTO outbox (type, time, img, created)
+                SELECT ?, ?, ?, ?
+                WHERE NOT EXISTS (SELECT 1 FROM events WHERE type = ? AND time = ?)
+                """,
+                (data["type"], data["time"], data["img"], int(time.time()),
+                 data["type"], data["time"])
+            )
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+        if cursor.rowcount == 0:
+            logging.info(f"Duplicate event not queued: {data['type']} at {data['time']}")
+            return False
+        self._wakeup.set()
+        return True
+
+    def wait(self, timeout=OUTBOX_POLL_INTERVAL):
+        """Sleep until new work is put or the timeout passes."""
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+    def recover(self):
+        """Release events claimed by a previous run so they are processed again."""
+        conn = self._connection()
+        cursor = conn.execute(
+            "UPDATE outbox SET state = 'pending', claimed_at = NULL WHERE state = 'claimed'"
+        )
+        conn.commit()
+        if cursor.rowcount:
+            logging.info(f"Recovered {cursor.rowcount} unfinished events from the outbox")
+        return cursor.rowcount
+
+    def claim(self, limit=None):
+        """Claim up to `limit` events in arrival order: [(id, type, time, img), ...]."""
+        conn = self._connection()
+        now = int(time.time())
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                """
+                SELECT id, type, time, img FROM outbox
+                WHERE (state = 'pending' AND not_before <= ?)
+                   OR (state = 'claimed' AND claimed_at < ?)
+                ORDER BY id LIMIT ?
+                """,
+                (now, now - self.claim_timeout, limit or self.batch_size)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET state = 'claimed', claimed_at = ? WHERE id = ?",
+                [(now, row[0]) for row in rows]
+            )
+            conn.commit()
+            return rows
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+    def add_deliveries(self, outbox_id, kind, chat_ids):
+        """Record the chats an event must reach; existing rows are kept as they are."""
+        conn = self._connection()
+        conn.executemany(
+            "INSERT OR IGNORE INTO outbox_deliveries (outbox_id, kind, chat_id) VALUES (?, ?, ?)",
+            [(outbox_id, kind, chat_id) for chat_id in chat_ids]
+        )
+        conn.commit()
+
+    def pending_deliveries(self, outbox_id, kind):
+        """Chats still waiting for this part of the event."""
+        rows = self._connection().execute(
+            """
+            SELECT chat_id FROM outbox_deliveries
+            WHERE outbox_id = ? AND kind = ? AND state = 'pending'
+            """,
+            (outbox_id, kind)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def record_deliveries(self, outbox_id, kind, results):
+        """Store per-chat results ({chat_id: delivered}); failures are retried up to max_attempts."""
+        now = int(time.time())
+        conn = self._connection()
+        conn.executemany(
+            """
+            UPDATE outbox_deliveries
+            SET attempts = attempts + 1,
+                state = CASE WHEN ? THEN 'sent'
+                             WHEN attempts + 1 >= ? THEN 'failed'
+                             ELSE 'pending' END,
+                updated = ?
+            WHERE outbox_id = ? AND kind = ? AND chat_id = ?
+            """,
+            [
+                (bool(delivered), self.max_attempts, now, outbox_id, kind, chat_id)
+                for chat_id, delivered in results.items()
+            ]
+        )
+        conn.commit()
+
+    def skip_deliveries(self, outbox_id, kind):
+        """Mark a part that will not be sent (e.g. a skipped chart) as finished."""
+        conn = self._connection()
+        conn.execute(
+            "UPDATE outbox_deliveries SET state = 'skipped' WHERE outbox_id = ? AND kind = ? AND state = 'pending'",
+            (outbox_id, kind)
+        )
+        conn.commit()
+
+    def complete(self, outbox_id):
+        """Finish an event, or release it for another attempt if deliveries remain.
+
+        Events with a delivery that failed for good are kept as 'failed'
+        rather than deleted, so the chats they missed stay on record.
+        """
+        conn = self._connection()
+        pending, failed = conn.execute(
+            """
+            SELECT COALESCE(SUM(state = 'pending'), 0), COALESCE(SUM(state = 'failed'), 0)
+            FROM outbox_deliveries WHERE outbox_id = ?
+            """,
+            (outbox_id,)
+        ).fetchone()
+        if pending:
+            self.release(outbox_id)
+            return False
+
+        if failed:
+            conn.execute(
+                "UPDATE outbox SET state = 'failed', claimed_at = NULL WHERE id = ?",
+                (outbox_id,)
+            )
+            conn.commit()
+            logging.warning(f"Outbox event {outbox_id} failed to reach {failed} chats")
+            return False
+
+        conn.execute("DELETE FROM outbox WHERE id = ?", (outbox_id,))
+        conn.commit()
+        return True
+
+    def release(self, outbox_id):
+        """Return a claimed event to the queue after a backoff, or park it as failed after max_attempts."""
+        conn = self._connection()
+        conn.execute(
+            """
+            UPDATE outbox
+            SET attempts = attempts + 1,
+                state = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END,
+                not_before = ? + ? * (1 << attempts),
+                claimed_at = NULL
+            WHERE id = ?
+            """,
+            (self.max_attempts, int(time.time()), self.retry_backoff, outbox_id)
+        )
+        conn.commit()
+
+outbox = Outbox()
@@ -0,0 +1,136 @@
+import json
+import random
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:  # orjson is optional; the stdlib decoder accepts bytes too
+    json_loads = json.loads
+
+class SSEEvent:
+    """One dispatched server-sent event. `data` stays as raw bytes."""
+
+    __slots__ = ('event', 'data', 'id', 'retry')
+
+    def __init__(self, event, data, id=None, retry=None):
+        self.event = event
+        self.data = data
+        self.id = id
+        self.retry = retry
+
+    def json(self):
+        """Decode the data field as JSON (raises json.JSONDecodeError)."""
+        return json_loads(self.data)
+
+    def __repr__(self):
+        return f"SSEEvent(event={self.event!r}, id={self.id!r}, data={self.data[:60]!r})"
+
+class SSEParser:
+    """Incremental parser for the text/event-stream format.
+
+    Feed it raw byte chunks as they arrive from the socket; it returns the
+    events completed by each chunk. Lines may end in LF, CRLF or CR and may
+    be split across chunks. Lines are parsed in place in the receive buffer;
+    only field values are copied out, and data is never decoded to str.
+    """
+
+    def __init__(self, last_event_id=None):
+        self._buffer = bytearray()
+        self._data = []
+        self._event_type = None
+        self.last_event_id = last_event_id
+        self.retry = None
+
+    def feed(self, chunk):
+        """Consume a chunk of bytes and return the list of completed SSEEvents."""
+        buffer = self._buffer
+        buffer += chunk
+        events = []
+        start = 0
+        length = len(buffer)
+
+        while start < length:
+            lf = buffer.find(b'\n', start)
+            cr = buffer.find(b'\r', start, lf if lf != -1 else length)
+            if cr != -1:
+                if cr + 1 == length:
+                    # A lone CR at the end may be the first half of CRLF
+                    break
+                end = cr
+                next_start = cr + 2 if buffer[cr + 1] == 0x0A else cr + 1
+            elif lf != -1:
+                end = lf
+                next_start = lf + 1
+            else:
+                break
+
+            event = self._process_line(buffer, start, end)
+            if event is not None:
+                events.append(event)
+            start = next_start
+
+        del buffer[:start]
+        return events
+
+    def _process_line(self, buffer, start, end):
+        """Handle buffer[start:end] in place; only field values are copied out."""
+        if start == end:
+            return self._dispatch()
+        if buffer[start] == 0x3A:  # ':' starts a comment / keep-alive
+            return None
+
+        colon = buffer.find(b':', start, end)
+        if colon == -1:
+            field_end = value_start = end
+        else:
+            field_end = colon
+            value_start = colon + 1
+            if value_start < end and buffer[value_start] == 0x20:
+                value_start += 1
+
+        field_length = field_end - start
+        if field_length == 4 and buffer.startswith(b'data', start, field_end):
+            self._data.append(bytes(buffer[value_start:end]))
+        elif field_length == 5 and buffer.startswith(b'event', start, field_end):
+            self._event_type = buffer[value_start:end].decode('utf-8', 'replace')
+        elif field_length == 2 and buffer.startswith(b'id', start, field_end):
+            value = buffer[value_start:end]
+            if b'\0' not in value:
+                self.last_event_id = value.decode('utf-8', 'replace')
+        elif field_length == 5 and buffer.startswith(b'retry', start, field_end):
+            value = buffer[value_start:end]
+            if value.isdigit():
+                self.retry = int(value)
+        return None
+
+    def _dispatch(self):
+        data, event_type = self._data, self._event_type
+        self._data = []
+        self._event_type = None
+        payload = data[0] if len(data) == 1 else b'\n'.join(data)
+        if not payload:
+            # Per spec, an empty data buffer dispatches nothing
+            return None
+        return SSEEvent(event_type or 'message', payload, self.last_event_id, self.retry)
+
+def iter_response_chunks(response, size=4096):
+    """Yield a streaming requests response's bytes as soon as they arrive.
+
+    iter_content() fills each chunk before yielding it unless the body is
+    chunk-encoded, so an HTTP/1.0 or connection-close stream would stall
+    until EOF. read1() returns whatever one socket read delivers.
+    """
+    raw = response.raw
+    if not hasattr(raw, 'read1'):
+        # urllib3 < 2.2 has no read1; byte-sized reads never wait for more data
+        yield from response.iter_content(chunk_size=1)
+        return
+    while True:
+        chunk = raw.read1(size, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+def reconnect_delay(attempt, base, cap):
+    """Capped exponential backoff with full jitter for reconnect attempt N (0-based)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
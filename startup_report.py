@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from utils import HEAVY_MODULES
+
+# Regression limits for the threaded runtime, with headroom over a clean
+# install (about 250-400 ms to import, 300-450 ms to first poll, 45-60 MB)
+MAX_IMPORT_MS = 800
+MAX_READY_MS = 1500
+MAX_RSS_MB = 100
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Runs main.main() up to its first bot.polling() call. The SSE listener and
+# event processor are replaced and the token is a dummy, so the probe never
+# connects to the SSE stream or Telegram.
+PROBE = (
+    f"HEAVY_MODULES = {HEAVY_MODULES!r}\n"
+    "import json, resource, sys, time\n"
+    f"sys.path.insert(0, {ROOT!r})\n"
+    "started = time.perf_counter()\n"
+    "import main\n"
+    "imported = time.perf_counter()\n"
+    "heavy = [m for m in HEAVY_MODULES if m in sys.modules]\n"
+    "def first_poll(*args, **kwargs):\n"
+    "    print(json.dumps({\n"
+    "        'import_s': imported - started,\n"
+    "        'ready_s': time.perf_counter() - started,\n"
+    "        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,\n"
+    "        'heavy': heavy\n"
+    "    }), flush=True)\n"
+    "    raise SystemExit(0)\n"
+    "main.TeleBot.polling = first_poll\n"
+    "main.listen_to_sse = main.process_events = lambda *args: None\n"
+    "main.main()\n"
+    "sys.exit('main() returned before polling; see the log above')\n"
+)
+
+def parse_importtime(stderr):
+    """Parse `-X importtime` output into (cumulative_us, self_us, module) rows."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    return rows
+
+def run_probe():
+    """Start the bot in a fresh interpreter; returns (probe results, importtime rows)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ, RUNTIME_MODE='threads', BOT_TOKEN='0:startup-probe',
+            DB_FILE=os.path.join(tmp, 'probe.db')
+        )
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE],
+            capture_output=True, text=True, check=True, env=env
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Report (and bound) the bot's startup import cost")
+    parser.add_argument('--top', type=int, default=15, help="slowest imports to list")
+    parser.add_argument('--max-import-ms', type=float, default=MAX_IMPORT_MS,
+                        help="fail if importing main takes longer")
+    parser.add_argument('--max-ready-ms', type=float, default=MAX_READY_MS,
+                        help="fail if reaching the first poll takes longer")
+    parser.add_argument('--max-rss-mb', type=float, default=MAX_RSS_MB,
+                        help="fail if RSS at the first poll is larger")
+    args = parser.parse_args()
+
+    probe, rows = run_probe()
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for cumulative_us, self_us, module in sorted(rows, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:8.1f}  {module}")
+
+    import_ms = probe['import_s'] * 1000
+    ready_ms = probe['ready_s'] * 1000
+    rss_mb = probe['max_rss_kb'] / 1024
+    print(f"\nimport main: {import_ms:.0f} ms, first poll: {ready_ms:.0f} ms, max RSS: {rss_mb:.1f} MB")
+    print(f"heavy modules loaded at import: {', '.join(probe['heavy']) or 'none'}")
+
+    failures = []
+    if import_ms > args.max_import_ms:
+        failures.append(f"import took {import_ms:.0f} ms (limit {args.max_import_ms:.0f} ms)")
+    if ready_ms > args.max_ready_ms:
+        failures.append(f"first poll took {ready_ms:.0f} ms (limit {args.max_ready_ms:.0f} ms)")
+    if rss_mb > args.max_rss_mb:
+        failures.append(f"RSS is {rss_mb:.1f} MB (limit {args.max_rss_mb:.1f} MB)")
+    if probe['heavy']:
+        failures.append(f"charting modules imported eagerly: {', '.join(probe['heavy'])}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
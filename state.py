@@ -0,0 +1,149 @@
+import logging
+import threading
+from datetime import datetime
+from database import DatabaseManager
+from singleflight import flight
+
+class PepitoState:
+    """Process-wide, in-memory view of Pépito's latest events.
+
+    Loaded once from the database at startup and updated by the event
+    processor, so status-style commands can answer without touching SQLite.
+    Event rows keep the database shape: (id, type, time, img).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_events = {'in': None, 'out': None}
+        self._last_transition_duration = None
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        """(Re)load the state from the database."""
+        last_events = {
+            'in': DatabaseManager.get_last_event('in'),
+            'out': DatabaseManager.get_last_event('out')
+        }
+        stats = DatabaseManager.get_location_stats()
+
+        with self._lock:
+            self._last_events = last_events
+            self._last_transition_duration = stats.get('last_transition_duration')
+            self._loaded = True
+
+        logging.info("Pépito state loaded from database")
+
+    def invalidate(self):
+        """Force the next read to reload from the database."""
+        with self._lock:
+            self._loaded = False
+
+    def _read(self):
+        """Return a consistent (last_events, last_transition) snapshot."""
+        with self._lock:
+            if self._loaded:
+                self.hits += 1
+                return dict(self._last_events), self._last_transition_duration
+            self.misses += 1
+
+        # Concurrent misses (e.g. a burst of /stats) share one database load
+        flight.do(('state', 'load'), self.load)
+        with self._lock:
+            return dict(self._last_events), self._last_transition_duration
+
+    def record_event(self, event_type, event_time, img_url, event_id=None):
+        """Apply a newly logged event. Returns the previous opposite event, if any."""
+        opposite_type = 'out' if event_type == 'in' else 'in'
+
+        with self._lock:
+            previous = self._last_events.get(event_type)
+            if previous and previous[2] > event_time:
+                # Out-of-order event; the current state is already newer
+                return None
+
+            prev_opposite = self._last_events.get(opposite_type)
+            if prev_opposite and prev_opposite[2] >= event_time:
+                prev_opposite = None
+
+            self._last_events = dict(self._last_events)
+            self._last_events[event_type] = (event_id, event_type, event_time, img_url)
+            self._last_transition_duration = (
+                event_time - prev_opposite[2] if prev_opposite else None
+            )
+            return prev_opposite
+
+    def get_last_event(self, event_type=None):
+        """Get the most recent event of a type, or of any type when None."""
+        last_events, _ = self._read()
+        if event_type is not None:
+            return last_events.get(event_type)
+
+        candidates = [event for event in last_events.values() if event]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda event: event[2])
+
+    def get_previous_opposite_event(self, event_type, event_time):
+        """Get the latest event of the opposite type before event_time."""
+        opposite_type = 'out' if event_type == 'in' else 'in'
+        last_events, _ = self._read()
+        event = last_events.get(opposite_type)
+        if event is None or event[2] < event_time:
+            return event
+        # An older event (e.g. an outbox retry): look it up through the sessions
+        return DatabaseManager.get_previous_opposite_event(event_type, event_time)
+
+    def get_location_stats(self):
+        """Same shape as DatabaseManager.get_location_stats(), served from memory."""
+        last_events, last_transition = self._read()
+        candidates = [event for event in last_events.values() if event]
+        if not candidates:
+            return {}
+
+        last_event = max(candidates, key=lambda event: event[2])
+        stats = {
+            'current_location': last_event[1],
+            'current_duration': int(datetime.now().timestamp()) - last_event[2]
+        }
+        if last_transition is not None:
+            stats['last_transition_duration'] = last_transition
+        return stats
+
+    def check_consistency(self):
+        """Compare the cached state with the database. Returns a list of mismatches."""
+        with self._lock:
+            if not self._loaded:
+                return []
+            last_events = dict(self._last_events)
+            last_transition = self._last_transition_duration
+
+        mismatches = []
+        for event_type in ('in', 'out'):
+            cached = last_events.get(event_type)
+            stored = DatabaseManager.get_last_event(event_type)
+            cached_key = cached[1:] if cached else None
+            stored_key = tuple(stored[1:]) if stored else None
+            if cached_key != stored_key:
+                mismatches.append((f"last_{event_type}", cached_key, stored_key))
+
+        stored_transition = DatabaseManager.get_location_stats().get('last_transition_duration')
+        if last_transition != stored_transition:
+            mismatches.append(('last_transition_duration', last_transition, stored_transition))
+
+        for name, cached, stored in mismatches:
+            logging.warning(f"State cache mismatch for {name}: cached={cached} db={stored}")
+        return mismatches
+
+    def get_metrics(self):
+        """Return cache hit/miss counters."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0.0
+            }
+
+pepito_state = PepitoState()
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from database import DatabaseManager
+
+@pytest.fixture
+def db_file(tmp_path, monkeypatch):
+    """Point DatabaseManager at a fresh database file for one test."""
+    DatabaseManager.close_connection()
+    path = str(tmp_path / "pepito.db")
+    monkeypatch.setattr(database, 'DB_FILE', path)
+    yield path
+    DatabaseManager.close_connection()
+    DatabaseManager.close_all_connections()
@@ -0,0 +1,48 @@
+"""Offline stand-ins for the ccxt exchange client."""
+import threading
+import time
+
+MINUTE_MS = 60_000
+
+def make_candle(ts):
+    """A deterministic 1m candle for timestamp ts (ms)."""
+    base = ts // MINUTE_MS % 1000
+    return [ts, base + 1.0, base + 3.0, base + 0.5, base + 2.0, 10.0]
+
+class FakeExchange:
+    """Serves generated 1m candles and records every fetch_ohlcv call.
+
+    `extra` candles past the requested limit are returned too, as some
+    exchanges do, so callers must trim overlapping pages themselves.
+    """
+
+    rateLimit = 0
+
+    def __init__(self, delay=0.0, extra=0, missing=(), until=None):
+        self.delay = delay
+        self.extra = extra
+        self.missing = set(missing)
+        # Newest candle that exists yet, like the one forming on a live exchange
+        self.until = until
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        with self._lock:
+            self.calls.append((since, limit))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            count = (limit or 500) + self.extra
+            return [
+                make_candle(ts)
+                for ts in range(since - self.extra * MINUTE_MS, since + count * MINUTE_MS, MINUTE_MS)
+                if ts not in self.missing and (self.until is None or ts <= self.until)
+            ]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
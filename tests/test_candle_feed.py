@@ -0,0 +1,73 @@
+import time
+
+from candle_feed import CandleFeeder, CandleRingBuffer
+from database import DatabaseManager
+from fakes import MINUTE_MS, FakeExchange, make_candle
+
+START = 1_700_000_040_000 - 1_700_000_040_000 % MINUTE_MS
+
+def minutes(first, last, skip=()):
+    return [make_candle(START + i * MINUTE_MS) for i in range(first, last + 1) if i not in skip]
+
+def timestamps(candles):
+    return [int(ts) for ts in candles.timestamp]
+
+def test_window_after_wraparound():
+    buffer = CandleRingBuffer(capacity=10)
+    buffer.update(minutes(0, 24))
+
+    candles = buffer.window(START + 15 * MINUTE_MS, START + 24 * MINUTE_MS)
+    assert timestamps(candles) == [START + i * MINUTE_MS for i in range(15, 25)]
+    assert list(candles.close) == [row[4] for row in minutes(15, 24)]
+
+    # Minute 14 shared its slot with minute 24 and was overwritten
+    assert buffer.window(START + 14 * MINUTE_MS, START + 24 * MINUTE_MS) is None
+
+def test_window_start_rounds_up_to_the_next_candle():
+    buffer = CandleRingBuffer(capacity=10)
+    buffer.update(minutes(0, 5))
+    candles = buffer.window(START + 2 * MINUTE_MS + 1, START + 4 * MINUTE_MS)
+    assert timestamps(candles) == [START + 3 * MINUTE_MS, START + 4 * MINUTE_MS]
+
+def test_window_with_gap_is_not_served():
+    buffer = CandleRingBuffer(capacity=30)
+    buffer.update(minutes(0, 20, skip={7}))
+
+    assert buffer.window(START, START + 20 * MINUTE_MS) is None
+    assert len(buffer.window(START + 8 * MINUTE_MS, START + 20 * MINUTE_MS)) == 13
+
+    # A later poll filling the gap makes the window servable
+    buffer.update(minutes(7, 7))
+    assert len(buffer.window(START, START + 20 * MINUTE_MS)) == 21
+
+def test_window_max_lag():
+    buffer = CandleRingBuffer(capacity=30)
+    buffer.update(minutes(0, 10))
+
+    candles = buffer.window(START, START + 12 * MINUTE_MS, max_lag=2)
+    assert timestamps(candles)[-1] == START + 10 * MINUTE_MS
+    assert buffer.window(START, START + 13 * MINUTE_MS, max_lag=2) is None
+    assert buffer.window(START, START + 13 * MINUTE_MS, max_lag=3) is not None
+
+def test_poll_fetches_since_latest_and_stores_closed_candles(db_file):
+    DatabaseManager.init_db()
+    now_ms = int(time.time() * 1000)
+    forming = now_ms - now_ms % MINUTE_MS
+    buffer = CandleRingBuffer(capacity=60)
+    buffer.update([make_candle(forming - i * MINUTE_MS) for i in range(10, 2, -1)])
+
+    exchange = FakeExchange(until=forming)
+    feeder = CandleFeeder(buffer=buffer, exchange=exchange)
+    feeder.poll()
+
+    assert exchange.calls == [(forming - 3 * MINUTE_MS, 500)]
+    assert buffer.latest_ts == forming
+    candles = buffer.window(forming - 10 * MINUTE_MS, forming)
+    assert timestamps(candles) == [forming - i * MINUTE_MS for i in range(10, -1, -1)]
+
+    # The forming candle is buffered but not stored: it is still changing
+    stored = DatabaseManager.get_connection().execute(
+        "SELECT ts FROM candles ORDER BY ts"
+    ).fetchall()
+    assert [row[0] for row in stored] == [forming - i * MINUTE_MS for i in range(3, 0, -1)]
+    assert feeder.get_metrics()['polls'] == 1
@@ -0,0 +1,53 @@
+import time
+
+from candle_store import CandleStore, PagedOHLCVFetcher, split_pages
+from database import DatabaseManager
+from fakes import MINUTE_MS, FakeExchange, make_candle
+
+START = 1_700_000_040_000 - 1_700_000_040_000 % MINUTE_MS
+
+def test_split_pages_at_page_limit():
+    pages = split_pages(START, START + 11 * MINUTE_MS, MINUTE_MS, 5)
+    assert pages == [
+        (START, START + 4 * MINUTE_MS),
+        (START + 5 * MINUTE_MS, START + 9 * MINUTE_MS),
+        (START + 10 * MINUTE_MS, START + 11 * MINUTE_MS),
+    ]
+
+def test_fetch_splits_pages_and_deduplicates_overlap():
+    exchange = FakeExchange(extra=3)
+    fetcher = PagedOHLCVFetcher(page_limit=5, max_in_flight=2)
+    end = START + 11 * MINUTE_MS
+
+    candles = fetcher.fetch(exchange, 'BTC/USDT', '1m', START, end)
+
+    assert sorted(exchange.calls) == [(START, 5), (START + 5 * MINUTE_MS, 5), (START + 10 * MINUTE_MS, 2)]
+    assert [candle[0] for candle in candles] == list(range(START, end + 1, MINUTE_MS))
+    assert candles == [make_candle(ts) for ts in range(START, end + 1, MINUTE_MS)]
+
+def test_fetch_bounds_pages_in_flight():
+    exchange = FakeExchange(delay=0.02)
+    fetcher = PagedOHLCVFetcher(page_limit=2, max_in_flight=3)
+
+    candles = fetcher.fetch(exchange, 'BTC/USDT', '1m', START, START + 19 * MINUTE_MS)
+
+    assert len(candles) == 20
+    assert len(exchange.calls) == 10
+    assert 1 < exchange.max_in_flight <= 3
+
+def test_second_call_only_fetches_forming_candle(db_file):
+    DatabaseManager.init_db()
+    store = CandleStore(PagedOHLCVFetcher(page_limit=5, max_in_flight=2))
+    now_ms = int(time.time() * 1000)
+    forming = now_ms - now_ms % MINUTE_MS
+    start = forming - 12 * MINUTE_MS
+
+    first = store.get_candles(FakeExchange(), 'BTC/USDT', '1m', start, forming)
+    assert [candle[0] for candle in first] == list(range(start, forming + 1, MINUTE_MS))
+
+    exchange = FakeExchange()
+    second = store.get_candles(exchange, 'BTC/USDT', '1m', start, forming)
+
+    assert exchange.calls == [(forming, 1)]
+    assert second == first
+    assert store.get_metrics()['from_store'] == 12
@@ -0,0 +1,74 @@
+import json
+import os
+
+import pytest
+
+from candle_store import timeframe_to_ms
+from candles import Candles
+
+MINUTE_MS = 60_000
+
+# Synthetic BTC/USDT candles, not recorded from an exchange: the 5m/15m/1h
+# rows were aggregated from the 1m rows with a plain loop like aggregate()
+with open(os.path.join(os.path.dirname(__file__), 'fixtures', 'synthetic_btcusdt_ohlcv.json')) as f:
+    FIXTURE = json.load(f)
+ONE_MINUTE = FIXTURE['1m']
+START = ONE_MINUTE[0][0]
+
+def rows(candles):
+    return [
+        [int(candles.timestamp[i]), candles.open[i], candles.high[i],
+         candles.low[i], candles.close[i], pytest.approx(candles.volume[i])]
+        for i in range(len(candles))
+    ]
+
+def aggregate(minutes):
+    """The candle built from exactly these 1m rows: first open, max high, min low, last close."""
+    return [
+        minutes[0][0], minutes[0][1], max(row[2] for row in minutes),
+        min(row[3] for row in minutes), minutes[-1][4], sum(row[5] for row in minutes)
+    ]
+
+@pytest.mark.parametrize('timeframe', ['5m', '15m', '1h'])
+def test_resample_matches_reference_aggregation(timeframe):
+    candles = Candles.from_ohlcv(ONE_MINUTE).resample(timeframe_to_ms(timeframe))
+    assert rows(candles) == FIXTURE[timeframe]
+
+def test_partial_edge_buckets():
+    # 22:07 to 00:52: both 15m edge buckets are cut short
+    series = Candles.from_ohlcv(ONE_MINUTE).slice_time(START + 7 * MINUTE_MS, START + 172 * MINUTE_MS)
+    resampled = rows(series.resample(timeframe_to_ms('15m')))
+
+    assert len(resampled) == 12
+    assert resampled[0] == pytest.approx(aggregate(ONE_MINUTE[7:15]))
+    assert resampled[0][0] == START
+    assert resampled[1:-1] == FIXTURE['15m'][1:-1]
+    assert resampled[-1] == pytest.approx(aggregate(ONE_MINUTE[165:173]))
+    assert resampled[-1][0] == START + 165 * MINUTE_MS
+
+def test_gaps():
+    # 22:20-22:24 is missing entirely; 23:31 and 23:44 are single gaps
+    missing = {20, 21, 22, 23, 24, 91, 104}
+    present = [row for i, row in enumerate(ONE_MINUTE) if i not in missing]
+
+    five = rows(Candles.from_ohlcv(present).resample(timeframe_to_ms('5m')))
+    native_five = [row for row in FIXTURE['5m'] if row[0] != START + 20 * MINUTE_MS]
+    assert [row[0] for row in five] == [row[0] for row in native_five]
+    for row, native in zip(five, native_five):
+        if row[0] in (START + 90 * MINUTE_MS, START + 100 * MINUTE_MS):
+            continue
+        assert row == native
+    assert five[17] == pytest.approx(aggregate(ONE_MINUTE[90:91] + ONE_MINUTE[92:95]))
+    assert five[19] == pytest.approx(aggregate(ONE_MINUTE[100:104]))
+
+    fifteen = rows(Candles.from_ohlcv(present).resample(timeframe_to_ms('15m')))
+    assert [row[0] for row in fifteen] == [row[0] for row in FIXTURE['15m']]
+    assert fifteen[1] == pytest.approx(aggregate(ONE_MINUTE[15:20] + ONE_MINUTE[25:30]))
+    assert fifteen[6] == pytest.approx(aggregate(ONE_MINUTE[90:91] + ONE_MINUTE[92:104]))
+    assert fifteen[0] == FIXTURE['15m'][0]
+
+    hourly = rows(Candles.from_ohlcv(present).resample(timeframe_to_ms('1h')))
+    assert hourly[2] == FIXTURE['1h'][2]
+    assert hourly[1] == pytest.approx(aggregate(
+        [row for i, row in enumerate(ONE_MINUTE[60:120], start=60) if i not in missing]
+    ))
@@ -0,0 +1,80 @@
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from chart_renderer import ChartRenderer
+
+class StuckPool:
+    """Pool whose jobs never finish; counts terminate() calls."""
+
+    def __init__(self):
+        self.submitted = threading.Semaphore(0)
+        self.terminated = 0
+
+    def apply_async(self, func, args, callback=None, error_callback=None):
+        self.submitted.release()
+
+    def terminate(self):
+        self.terminated += 1
+
+    def join(self):
+        pass
+
+class FakeFigure:
+    def to_json(self):
+        return '{}'
+
+def test_timeout_recycles_pool_once_and_fails_other_jobs(monkeypatch):
+    renderer = ChartRenderer(pool_size=2, queue_size=4, timeout=0.2)
+    stuck = StuckPool()
+    renderer._pool = stuck
+    replacements = []
+    monkeypatch.setattr(renderer, 'start', lambda: replacements.append(StuckPool()))
+
+    # The first job times out; the other two are queued behind it on the same pool
+    errors = []
+    def render(delay):
+        threading.Event().wait(delay)
+        try:
+            renderer.render(FakeFigure())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=render, args=(delay,)) for delay in (0, 0.1, 0.1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=2)
+
+    assert stuck.terminated == 1
+    assert len(replacements) == 1
+    assert sum(isinstance(e, FutureTimeoutError) for e in errors) == 1
+    assert sum(isinstance(e, RuntimeError) for e in errors) == 2
+    assert renderer.get_metrics()['failures'] == 3
+
+def test_recycle_of_a_replaced_pool_is_ignored():
+    renderer = ChartRenderer(pool_size=1)
+    old, current = StuckPool(), StuckPool()
+    renderer._pool = current
+
+    renderer._restart(old)
+
+    assert renderer._pool is current
+    assert current.terminated == 0
+
+def test_stuck_render_times_out_and_recycles_pool(monkeypatch):
+    renderer = ChartRenderer(pool_size=1, timeout=0.1)
+    stuck = StuckPool()
+    renderer._pool = stuck
+    replacement = StuckPool()
+
+    def start():
+        renderer._pool = replacement
+    monkeypatch.setattr(renderer, 'start', start)
+
+    with pytest.raises(FutureTimeoutError):
+        renderer.render(FakeFigure())
+
+    assert stuck.terminated == 1
+    assert renderer._pool is replacement
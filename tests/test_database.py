@@ -0,0 +1,76 @@
+import sqlite3
+
+import pytest
+
+from database import MIGRATIONS, DatabaseManager
+
+BASELINE_EVENTS = [
+    ('in', 1000, 'a.png'),
+    ('in', 1000, 'a.png'),
+    ('out', 2000, 'b.png'),
+    ('out', 3000, 'c.png'),
+    ('out', 3000, 'c-replayed.png'),
+    ('in', 4000, 'd.png'),
+]
+
+def test_migrated_queries_use_indexes(db_file):
+    assert DatabaseManager.init_db()
+    conn = DatabaseManager.get_connection()
+    assert DatabaseManager.get_schema_version(conn) == len(MIGRATIONS)
+    assert DatabaseManager.check_query_plans() == []
+
+def test_upgrade_baseline_database_with_duplicates(db_file):
+    # The original schema: no indexes, no user_version, replayed events stored twice
+    conn = sqlite3.connect(db_file)
+    conn.execute("""
+        CREATE TABLE events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT,
+            time INTEGER,
+            img TEXT
+        )
+    """)
+    conn.executemany("INSERT INTO events (type, time, img) VALUES (?, ?, ?)", BASELINE_EVENTS)
+    conn.commit()
+    conn.close()
+
+    assert DatabaseManager.init_db()
+    conn = DatabaseManager.get_connection()
+    assert DatabaseManager.get_schema_version(conn) == len(MIGRATIONS)
+
+    # Migration 4 keeps the first copy of each (type, time)
+    rows = conn.execute("SELECT id, type, time, img FROM events ORDER BY id").fetchall()
+    assert rows == [
+        (1, 'in', 1000, 'a.png'),
+        (3, 'out', 2000, 'b.png'),
+        (4, 'out', 3000, 'c.png'),
+        (6, 'in', 4000, 'd.png'),
+    ]
+
+    # ...and the unique index makes later replays no-ops
+    assert DatabaseManager.log_event('out', 3000, 'again.png') is False
+    assert DatabaseManager.log_event('out', 5000, 'e.png') is True
+
+    assert DatabaseManager.check_query_plans() == []
+    assert DatabaseManager.check_sessions() == []
+    assert DatabaseManager.get_previous_opposite_event('out', 5000)[1:3] == ('in', 4000)
+
+def test_failed_migration_leaves_schema_and_version_unchanged(db_file, monkeypatch):
+    assert DatabaseManager.init_db()
+    conn = DatabaseManager.get_connection()
+    version = DatabaseManager.get_schema_version(conn)
+
+    broken = ["ALTER TABLE outbox ADD COLUMN note TEXT", "SELECT * FROM missing_table"]
+    monkeypatch.setattr('database.MIGRATIONS', MIGRATIONS + [broken])
+    with pytest.raises(sqlite3.Error):
+        DatabaseManager.migrate(conn)
+
+    # The ALTER TABLE is rolled back together with the version bump
+    assert DatabaseManager.get_schema_version(conn) == version
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(outbox)")]
+    assert 'note' not in columns
+
+    # ...so the fixed migration applies cleanly on the next start
+    monkeypatch.setattr('database.MIGRATIONS', MIGRATIONS + [broken[:1]])
+    assert DatabaseManager.migrate(conn) == version + 1
+    assert 'note' in [row[1] for row in conn.execute("PRAGMA table_info(outbox)")]
@@ -0,0 +1,33 @@
+import pytest
+
+from database import DatabaseManager
+from event_writer import EventWriter
+
+@pytest.fixture
+def writer(db_file):
+    assert DatabaseManager.init_db()
+    writer = EventWriter()
+    yield writer
+    writer.stop()
+
+def test_lone_event_commits_on_callers_thread(writer):
+    future = writer.submit('in', 1000, 'a.png')
+
+    assert future.done() and future.result() is True
+    assert writer._thread is None
+
+def test_unexpected_error_fails_batch_and_keeps_writer(writer, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(DatabaseManager, 'record_session', broken)
+    futures = writer.submit_many([('in', 1000, 'a.png'), ('out', 2000, 'b.png')])
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+
+    # The failed batch was rolled back and the writer thread is still serving
+    monkeypatch.undo()
+    futures = writer.submit_many([('in', 1000, 'a.png'), ('out', 2000, 'b.png')])
+    assert [future.result(timeout=5) for future in futures] == [True, True]
+    assert writer._thread.is_alive()
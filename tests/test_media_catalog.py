@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+import media_catalog
+import media_optimizer
+from media_catalog import MediaCatalog
+
+@pytest.fixture
+def media_dirs(tmp_path, monkeypatch):
+    images = tmp_path / "images"
+    images.mkdir()
+    monkeypatch.setattr(media_optimizer, 'MEDIA_CACHE_DIR', str(tmp_path / "cache"))
+    monkeypatch.setattr(media_optimizer, '_manifest', None)
+    monkeypatch.setattr(media_catalog, 'MEDIA_OPTIMIZE', True)
+    return images
+
+def fake_convert_photo(source, output):
+    with open(output, 'wb') as f:
+        f.write(b'small')
+    return True
+
+def test_scan_uses_manifest_without_reading_files(media_dirs, monkeypatch):
+    (media_dirs / "cat.png").write_bytes(b'x' * 1000)
+    (media_dirs / "new.png").write_bytes(b'y' * 1000)
+    monkeypatch.setattr(media_optimizer, '_convert_photo', fake_convert_photo)
+    catalog = MediaCatalog(str(media_dirs))
+    catalog.optimize()
+
+    # Scans after a restart must not hash the media again
+    monkeypatch.setattr(media_optimizer, '_manifest', None)
+    monkeypatch.setattr(media_optimizer, 'content_hash', lambda path: pytest.fail("file was hashed"))
+    (media_dirs / "new.png").write_bytes(b'z' * 1200)
+    catalog = MediaCatalog(str(media_dirs))
+    catalog.refresh(force=True)
+
+    items = {os.path.basename(item.path): item for item in catalog._all}
+    optimized = [name for name in items if name.endswith('.jpg')]
+    assert len(optimized) == 1
+    assert items[optimized[0]].source == f"media:{optimized[0]}"
+    # Edited since the optimizer ran: served as is until it runs again
+    assert items['new.png'].source.startswith("media:new.png:")
@@ -0,0 +1,69 @@
+import pytest
+
+import outbox as outbox_module
+from database import DatabaseManager
+from outbox import Outbox
+
+EVENT = {'event': 'pepito', 'type': 'in', 'time': 1000, 'img': 'a.jpg'}
+
+@pytest.fixture
+def queue(db_file, monkeypatch):
+    DatabaseManager.init_db()
+    clock = [1_700_000_000.0]
+    monkeypatch.setattr(outbox_module.time, 'time', lambda: clock[0])
+    queue = Outbox(max_attempts=3, retry_backoff=30)
+    queue.clock = clock
+    return queue
+
+def outbox_row(outbox_id):
+    return DatabaseManager.get_connection().execute(
+        "SELECT state, attempts FROM outbox WHERE id = ?", (outbox_id,)
+    ).fetchone()
+
+def test_released_event_waits_for_backoff(queue):
+    queue.put(EVENT)
+    [(outbox_id, *_)] = queue.claim()
+    queue.release(outbox_id)
+
+    assert queue.claim() == []
+    queue.clock[0] += 29
+    assert queue.claim() == []
+    queue.clock[0] += 1
+    assert [row[0] for row in queue.claim()] == [outbox_id]
+
+    # The second retry waits twice as long
+    queue.release(outbox_id)
+    queue.clock[0] += 59
+    assert queue.claim() == []
+    queue.clock[0] += 1
+    assert [row[0] for row in queue.claim()] == [outbox_id]
+
+def test_failed_delivery_keeps_event_as_failed(queue):
+    queue.put(EVENT)
+    for attempt in range(3):
+        [(outbox_id, *_)] = queue.claim()
+        if attempt == 0:
+            queue.add_deliveries(outbox_id, 'photo', [1, 2])
+        pending = queue.pending_deliveries(outbox_id, 'photo')
+        queue.record_deliveries(outbox_id, 'photo', {chat_id: chat_id == 1 for chat_id in pending})
+        assert queue.complete(outbox_id) is False
+        queue.clock[0] += 3600
+
+    assert outbox_row(outbox_id) == ('failed', 2)
+    deliveries = DatabaseManager.get_connection().execute(
+        "SELECT chat_id, state, attempts FROM outbox_deliveries WHERE outbox_id = ? ORDER BY chat_id",
+        (outbox_id,)
+    ).fetchall()
+    assert deliveries == [(1, 'sent', 1), (2, 'failed', 3)]
+    assert queue.claim() == []
+    # Replays of a failed event are not queued again
+    assert queue.put(EVENT) is False
+
+def test_fully_delivered_event_is_removed(queue):
+    queue.put(EVENT)
+    [(outbox_id, *_)] = queue.claim()
+    queue.add_deliveries(outbox_id, 'photo', [1, 2])
+    queue.record_deliveries(outbox_id, 'photo', {1: True, 2: True})
+
+    assert queue.complete(outbox_id) is True
+    assert outbox_row(outbox_id) is None
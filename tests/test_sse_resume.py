@@ -0,0 +1,142 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import main
+from database import DatabaseManager
+from outbox import Outbox
+
+def frame(event_id, event_type, event_time):
+    data = json.dumps({'event': 'pepito', 'type': event_type, 'time': event_time, 'img': f'{event_time}.jpg'})
+    return f'id: {event_id}\ndata: {data}\n\n'.encode()
+
+# Valid JSON that is not a usable pepito event; skipped without reconnecting
+MALFORMED = (
+    b'data: []\n\n'
+    b'data: "x"\n\n'
+    b'data: {"event": "pepito", "type": "in", "time": 3500}\n\n'
+    b'data: {"event": "pepito", "type": "sideways", "time": 3600, "img": "x.jpg"}\n\n'
+)
+
+# What each successive connection sends before the server drops it
+CONNECTIONS = [
+    # Drops in the middle of event 3
+    frame(1, 'out', 1000) + frame(2, 'in', 2000) + frame(3, 'out', 3000)[:20],
+    # Resumes after 2 but replays it, as a server with coarse cursors might
+    b': keep-alive\n\n' + frame(2, 'in', 2000) + frame(3, 'out', 3000) + MALFORMED + frame(4, 'in', 4000),
+    b'',
+]
+
+class StopListening(BaseException):
+    pass
+
+class FlakySSEHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.0'
+    last_event_ids = []
+
+    def do_GET(self):
+        self.last_event_ids.append(self.headers.get('Last-Event-ID'))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        body = CONNECTIONS[len(self.last_event_ids) - 1]
+        # Small writes so frames straddle reads
+        for start in range(0, len(body), 7):
+            self.wfile.write(body[start:start + 7])
+            self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def sse_server():
+    FlakySSEHandler.last_event_ids = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FlakySSEHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/sse'
+    server.shutdown()
+    server.server_close()
+
+def test_listener_resumes_and_ingests_each_event_once(db_file, sse_server, monkeypatch):
+    DatabaseManager.init_db()
+    monkeypatch.setattr(main, 'SSE_URL', sse_server)
+
+    def reconnect_delay(attempt, base, cap):
+        if len(FlakySSEHandler.last_event_ids) == len(CONNECTIONS):
+            raise StopListening()
+        return 0
+
+    monkeypatch.setattr(main, 'reconnect_delay', reconnect_delay)
+
+    queue = Outbox()
+    results = []
+    original_put = queue.put
+    queue.put = lambda data: results.append(original_put(data)) or results[-1]
+
+    def listen():
+        try:
+            main.listen_to_sse(queue, main.create_session())
+        except StopListening:
+            pass
+
+    listener = threading.Thread(target=listen, daemon=True)
+    listener.start()
+    listener.join(timeout=10)
+    assert not listener.is_alive()
+
+    assert FlakySSEHandler.last_event_ids == [None, '2', '4']
+    assert results == [True, True, False, True, True]
+    rows = DatabaseManager.get_connection().execute(
+        "SELECT type, time FROM outbox ORDER BY id"
+    ).fetchall()
+    assert rows == [('out', 1000), ('in', 2000), ('out', 3000), ('in', 4000)]
+
+class HeldOpenSSEHandler(BaseHTTPRequestHandler):
+    """Non-chunked stream that sends one frame and then keeps the connection open."""
+    protocol_version = 'HTTP/1.0'
+    release = None
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        self.wfile.write(frame(1, 'in', 1000))
+        self.wfile.flush()
+        self.release.wait(10)
+
+    def log_message(self, format, *args):
+        pass
+
+def test_listener_reads_frames_before_a_non_chunked_stream_ends(db_file, monkeypatch):
+    DatabaseManager.init_db()
+    HeldOpenSSEHandler.release = threading.Event()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), HeldOpenSSEHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(main, 'SSE_URL', f'http://127.0.0.1:{server.server_address[1]}/sse')
+
+    received = []
+    class FirstEventOutbox:
+        def put(self, data):
+            received.append(data)
+            raise StopListening()
+
+    def listen():
+        try:
+            main.listen_to_sse(FirstEventOutbox(), main.create_session())
+        except StopListening:
+            pass
+
+    listener = threading.Thread(target=listen, daemon=True)
+    try:
+        listener.start()
+        listener.join(timeout=2)
+        # The event arrived while the server still held the connection open
+        assert not listener.is_alive()
+        assert [(data['type'], data['time']) for data in received] == [('in', 1000)]
+    finally:
+        HeldOpenSSEHandler.release.set()
+        server.shutdown()
+        server.server_close()
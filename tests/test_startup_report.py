@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('resource')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_startup_within_committed_limits(tmp_path):
+    # Runs from a scratch directory: main() creates its log, images and cache there
+    result = subprocess.run(
+        [sys.executable, os.path.join(ROOT, 'startup_report.py'), '--top', '0'],
+        cwd=tmp_path, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert 'heavy modules loaded at import: none' in result.stdout
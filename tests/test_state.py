@@ -0,0 +1,30 @@
+from database import DatabaseManager
+from state import PepitoState
+
+EVENTS = [
+    ('out', 1000, 'a.jpg'),
+    ('in', 2000, 'b.jpg'),
+    ('in', 2500, 'c.jpg'),
+    ('out', 3000, 'd.jpg'),
+    ('in', 4000, 'e.jpg'),
+]
+
+def test_previous_opposite_event_for_an_older_event(db_file):
+    DatabaseManager.init_db(EVENTS)
+    state = PepitoState()
+    state.load()
+
+    # Served from memory for the newest events
+    assert state.get_previous_opposite_event('out', 5000)[1:3] == ('in', 4000)
+    assert state.get_previous_opposite_event('in', 4000)[1:3] == ('out', 3000)
+
+    # A retried older event predates the cached opposite event
+    assert state.get_previous_opposite_event('out', 3000)[1:3] == ('in', 2500)
+    assert state.get_previous_opposite_event('in', 2500)[1:3] == ('out', 1000)
+    assert state.get_previous_opposite_event('in', 1000) is None
+
+def test_previous_opposite_event_without_opposite_events(db_file):
+    DatabaseManager.init_db([('in', 1000, 'a.jpg')])
+    state = PepitoState()
+    state.load()
+    assert state.get_previous_opposite_event('in', 2000) is None
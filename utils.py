@@ -1,9 +1,16 @@
 import requests
 import os
+import sys
+import time
 import logging
 from pathlib import Path
 from datetime import datetime
 from config import IMAGES_DIR
+from media_catalog import media_catalog
+
+# Charting modules that must only load on first use. numpy is not listed:
+# pyTelegramBotAPI imports Pillow, and Pillow imports numpy when installed
+HEAVY_MODULES = ('plotly', 'ccxt', 'kaleido', 'chart_generator', 'candles')
 
 def setup_logging():
     """Configure logging for the application."""
@@ -16,6 +23,19 @@ def setup_logging():
         ]
     )
 
+def log_startup_report(started):
+    """Log time-to-ready and memory, and whether charting was imported eagerly."""
+    try:
+        import resource
+        rss = f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB"
+    except ImportError:  # not available on Windows
+        rss = "n/a"
+    heavy = [m for m in HEAVY_MODULES if m in sys.modules]
+    logging.info(
+        f"Startup: ready in {time.perf_counter() - started:.2f}s, max RSS {rss}, "
+        f"charting modules loaded: {', '.join(heavy) or 'none'}"
+    )
+
 def calculate_time_parts(seconds):
     """Calculate days, hours, minutes from seconds."""
     days = seconds // (24 * 3600)
@@ -60,57 +80,17 @@ def ensure_image_directory():
 
 
 def get_random_image(gif_only=False):
-    """Get a random image from the images directory."""
-    try:
-        logging.info(f"Checking images directory: {IMAGES_DIR}")
-        
-        if not os.path.exists(IMAGES_DIR):
-            logging.error(f"Images directory {IMAGES_DIR} not found")
-            return None
-
-        if gif_only:
-            extensions = ['.gif']
-        else:
-            extensions = ['.png', '.jpg', '.jpeg', '.gif']
-
-        logging.info(f"Looking for images with extensions: {extensions}")
-
-        images = [
-            f for f in os.listdir(IMAGES_DIR) 
-            if any(f.lower().endswith(ext) for ext in extensions)
-        ]
-
-        logging.info(f"Found {len(images)} images in directory")
-        
-        if not images:
-            logging.error("No images found in images directory")
-            return None
-
-        selected_image = random.choice(images)
-        logging.info(f"Selected image: {selected_image}")
-        return os.path.join(IMAGES_DIR, selected_image)
-    except Exception as e:
-        logging.error(f"Error getting random image: {e}")
+    """Get a random image path from the media catalog."""
+    item = media_catalog.random_item(gif_only=gif_only)
+    if item is None:
+        logging.error("No images found in images directory")
         return None
+    return item.path
 
 
 def get_random_gif():
-    """Get a random GIF from the images directory"""
-    try:
-        if not os.path.exists(IMAGES_DIR):
-            logging.error(f"Images directory {IMAGES_DIR} not found")
-            return None
-
-        images = [f for f in os.listdir(IMAGES_DIR) if f.lower().endswith(('.gif',))]
-        if not images:
-            logging.error("No GIF images found in images directory")
-            return None
-            
-        random_image = random.choice(images)
-        return os.path.join(IMAGES_DIR, random_image)
-    except Exception as e:
-        logging.error(f"Error getting random GIF: {e}")
-        return None
+    """Get a random GIF path from the media catalog"""
+    return get_random_image(gif_only=True)
 
 def get_status_text(current_location, current_duration, last_transition):
     """Generate formatted status text."""